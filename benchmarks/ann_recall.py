@@ -0,0 +1,121 @@
+"""
+Recall vs. latency of the FAISS index types available to SemanticOptimizer.
+
+Builds a synthetic corpus of Python-like code chunks, embeds it, and reports
+build time, index memory, query latency and recall@k (against exact search)
+for every ``index_type`` across a sweep of search parameters.
+
+    python benchmarks/ann_recall.py --chunks 1000000 --dim 256
+    python benchmarks/ann_recall.py --chunks 50000 --model sentence-transformers/all-MiniLM-L6-v2
+
+Without ``--model`` chunks are embedded by feature hashing of their
+identifiers, which is fast enough for million-chunk runs and keeps the
+clustered structure real code embeddings have.
+"""
+import argparse
+import random
+import time
+import zlib
+
+import numpy as np
+
+from scaledown.optimizer.ann_index import build_index, index_memory_bytes
+
+VERBS = ["load", "parse", "validate", "render", "fetch", "store", "encode", "merge", "filter", "refresh"]
+NOUNS = ["user", "token", "config", "batch", "request", "session", "cache", "record", "schema", "image"]
+BODIES = [
+    "    for item in {noun}s:\n        if item.{attr}:\n            yield item\n",
+    "    result = self.{attr}.get({noun})\n    if result is None:\n        raise KeyError({noun})\n    return result\n",
+    "    with open(path) as f:\n        {noun} = json.load(f)\n    return {noun}.{attr}\n",
+    "    return [{noun}.{attr} for {noun} in self.{noun}s if {noun}]\n",
+]
+
+SWEEP = {
+    "flat": [{}],
+    "ivf": [{"nprobe": p} for p in (1, 8, 32)],
+    "hnsw": [{"ef_search": ef} for ef in (16, 64, 256)],
+    "ivfpq": [{"nprobe": p} for p in (8, 32)],
+}
+
+
+def synthetic_chunks(n, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        verb, noun, attr = rng.choice(VERBS), rng.choice(NOUNS), rng.choice(NOUNS)
+        body = rng.choice(BODIES).format(noun=noun, attr=attr)
+        yield f"def {verb}_{noun}_{i % 97}(self, {noun}):\n{body}"
+
+
+def hash_embed(texts, dim):
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in text.replace("(", " ").replace(")", " ").replace(".", " ").split():
+            h = zlib.crc32(token.encode())
+            vectors[row, h % dim] += 1.0 if h & 0x80000000 else -1.0
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    return vectors
+
+
+def embed(texts, args):
+    if args.model:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(args.model)
+        return np.asarray(model.encode(texts, batch_size=256, show_progress_bar=True), dtype=np.float32)
+    return hash_embed(texts, args.dim)
+
+
+def apply_search_params(index, params):
+    if "nprobe" in params:
+        index.nprobe = params["nprobe"]
+    if "ef_search" in params:
+        index.hnsw.efSearch = params["ef_search"]
+
+
+def measure(index, queries, k):
+    latencies = []
+    found = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+    return np.array(found), np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def recall(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=256, help="Embedding size when hashing")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--model", help="SentenceTransformer model to embed with instead of hashing")
+    parser.add_argument("--types", nargs="+", default=list(SWEEP), choices=list(SWEEP))
+    args = parser.parse_args()
+
+    print(f"Embedding {args.chunks} chunks...")
+    chunks = list(synthetic_chunks(args.chunks))
+    vectors = embed(chunks, args)
+    queries = embed([f"{v} the {n}" for v, n in zip(VERBS * 100, NOUNS[::-1] * 100)][:args.queries], args)
+
+    exact, _ = build_index(vectors, "flat")
+    _, truth = exact.search(queries, args.k)
+
+    print(f"\n{'index':<8}{'params':<18}{'build s':>9}{'memory MB':>11}{'p50 ms':>9}{'p99 ms':>9}{'recall@' + str(args.k):>11}")
+    for index_type in args.types:
+        start = time.perf_counter()
+        index, built = build_index(vectors, index_type)
+        build_s = time.perf_counter() - start
+        memory_mb = index_memory_bytes(index) / 2 ** 20
+        for params in SWEEP[index_type]:
+            apply_search_params(index, params)
+            found, p50, p99 = measure(index, queries, args.k)
+            label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+            print(f"{built:<8}{label:<18}{build_s:>9.2f}{memory_mb:>11.1f}{p50:>9.3f}{p99:>9.3f}{recall(found, truth):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
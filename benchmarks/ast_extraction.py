@@ -0,0 +1,81 @@
+"""
+Chunk extraction time on large generated modules.
+
+Compares ``extract_semantic_units`` with the previous approach of calling
+``ast.get_source_segment`` per node, which re-splits the source every time.
+
+    python benchmarks/ast_extraction.py --lines 50000
+"""
+import argparse
+import ast
+import time
+
+from scaledown.optimizer.semantic_code import extract_semantic_units
+
+TEMPLATE = '''
+class Model{i}:
+    """Generated model {i}."""
+
+    @property
+    def value(self):
+        return self._value_{i}
+
+    async def fetch(self, client):
+        data = await client.get("/items/{i}")
+        return [row for row in data if row]
+
+def helper_{i}(a, b):
+    return a + b * {i}
+'''
+
+
+def generate(lines):
+    parts = []
+    i = 0
+    while len(parts) * TEMPLATE.count("\n") < lines:
+        parts.append(TEMPLATE.format(i=i))
+        i += 1
+    return "".join(parts)
+
+
+def get_source_segment_units(source):
+    tree = ast.parse(source)
+    return [
+        ast.get_source_segment(source, node)
+        for node in ast.walk(tree)
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+
+
+def timed(fn, source, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(source)
+        best = min(best, time.perf_counter() - start)
+    return best, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1_000, 5_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--baseline-max-lines", type=int, default=5_000,
+        help="Skip the quadratic baseline above this size (it takes over an hour at 50k lines)",
+    )
+    args = parser.parse_args()
+
+    print(f"{'lines':>8}{'units':>8}{'get_source_segment s':>22}{'single pass s':>15}{'speedup':>9}")
+    for lines in args.lines:
+        source = generate(lines)
+        new_s, units = timed(lambda s: extract_semantic_units(s, "generated.py")[1:], source, args.repeat)
+        if lines > args.baseline_max_lines:
+            print(f"{source.count(chr(10)):>8}{units:>8}{'-':>22}{new_s:>15.3f}{'-':>9}")
+            continue
+        old_s, _ = timed(get_source_segment_units, source, args.repeat)
+        print(f"{source.count(chr(10)):>8}{units:>8}{old_s:>22.3f}{new_s:>15.3f}{old_s / new_s:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Scratch-file overhead of HasteOptimizer on in-memory string contexts.
+
+HASTE reads source from a path, so string contexts need a scratch file.
+This compares the previous round trip (temp file in the default temp dir,
+re-opened to count original tokens, deleted) with the current one (one
+write to tmpfs, tokens counted from the string), sequentially and under
+thread concurrency. ``--end-to-end`` also runs HASTE selection per query.
+
+    python benchmarks/haste_scratch.py --threads 8
+    TMPDIR=/mnt/nfs/tmp python benchmarks/haste_scratch.py   # network-backed /tmp
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hybrid_retrieval import generate
+from scaledown.optimizer.haste import _scratch_dir, _write_scratch_file
+from scaledown.types.metrics import count_tokens
+
+
+def before(context, select):
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False, encoding="utf-8") as f:
+        f.write(context)
+    try:
+        select(f.name)
+        with open(f.name, "r", encoding="utf-8") as src:
+            count_tokens(src.read())
+    finally:
+        if os.path.exists(f.name):
+            os.unlink(f.name)
+
+
+def after(context, select):
+    path = _write_scratch_file(context.encode("utf-8"))
+    try:
+        select(path)
+        count_tokens(context)
+    finally:
+        os.unlink(path)
+
+
+def measure(fn, context, select, queries, threads):
+    def timed(query):
+        start = time.perf_counter()
+        fn(context, lambda path: select(path, query))
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = list(pool.map(timed, queries))
+    return statistics.median(latencies), len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--functions", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--end-to-end", action="store_true", help="Run HASTE selection too, not only file I/O")
+    args = parser.parse_args()
+
+    context, targets = generate(args.functions)
+    queries = [targets[i % len(targets)][1] for i in range(args.queries)]
+    if args.end_to_end:
+        from haste import select_from_file
+        select = lambda path, query: select_from_file(path=path, query=query)
+    else:
+        select = lambda path, query: None
+
+    print(f"{len(context)} byte context, {len(queries)} queries")
+    print(f"before: {tempfile.gettempdir()}, after: {_scratch_dir() or tempfile.gettempdir()}\n")
+    print(f"{'path':<10}{'threads':>8}{'median ms':>11}{'queries/s':>11}")
+    for threads in (1, args.threads):
+        for name, fn in (("before", before), ("after", after)):
+            median_ms, qps = measure(fn, context, select, queries, threads)
+            print(f"{name:<10}{threads:>8}{median_ms:>11.3f}{qps:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
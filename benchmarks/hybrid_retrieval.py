@@ -0,0 +1,78 @@
+"""
+Latency and recall of dense vs. hybrid (BM25 + embedding) retrieval.
+
+Generates one large module of functions whose names describe what they do,
+asks for specific functions in plain words, and reports per-query latency
+and recall@k of ``SemanticOptimizer(retrieval="dense")`` against
+``retrieval="hybrid"``.
+
+    python benchmarks/hybrid_retrieval.py --functions 5000 --model sentence-transformers/all-MiniLM-L6-v2
+
+Without ``--model`` chunks are embedded with ``HashingEncoder``, which is far
+cheaper than a transformer, so the speed-up shown is a lower bound.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from ann_recall import NOUNS, VERBS
+from scaledown.optimizer import SemanticOptimizer
+
+QUALIFIERS = ["cached", "remote", "pending", "archived", "default", "shared", "nested", "legacy"]
+
+
+def generate(n, seed=0):
+    rng = random.Random(seed)
+    functions, targets = [], []
+    for i in range(n):
+        verb, qualifier, noun = rng.choice(VERBS), rng.choice(QUALIFIERS), rng.choice(NOUNS)
+        name = f"{verb}_{qualifier}_{noun}_{i}"
+        functions.append(
+            f"def {name}(self, {noun}):\n"
+            f"    \"\"\"{verb.capitalize()} a {qualifier} {noun}.\"\"\"\n"
+            f"    result = self.store.get({noun})\n"
+            f"    return result\n"
+        )
+        targets.append((name, f"{verb} the {qualifier} {noun} {i}"))
+    return "\n\n".join(functions), targets
+
+
+def run(opt, source, queries, k):
+    latencies, hits = [], 0
+    for name, query in queries:
+        start = time.perf_counter()
+        result = opt.optimize(context=source, query=query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += f"def {name}(" in result.content
+    return statistics.median(latencies), hits / len(queries), result.metrics.details
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--functions", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--model", help="SentenceTransformer model; defaults to hashed embeddings")
+    args = parser.parse_args()
+
+    source, targets = generate(args.functions)
+    queries = random.Random(1).sample(targets, args.queries)
+    common = {"top_k": args.k}
+    if args.model:
+        common["model_name"] = args.model
+    else:
+        common["encoder"] = "hashing"
+
+    print(f"{args.functions} functions, {source.count(chr(10))} lines, {args.queries} queries\n")
+    print(f"{'retrieval':<10}{'median ms':>11}{'recall@' + str(args.k):>11}{'embedded/query':>16}")
+    for retrieval in ("dense", "hybrid"):
+        opt = SemanticOptimizer(retrieval=retrieval, **common)
+        opt.optimize(context=source, query="warmup")  # parse cache and model load
+        median_ms, recall, details = run(opt, source, queries, args.k)
+        embedded = details.get("chunks_embedded", args.functions)
+        print(f"{retrieval:<10}{median_ms:>11.1f}{recall:>11.2f}{embedded:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Memory vs. recall of reduced-precision embedding storage.
+
+Indexes a synthetic code corpus with every ``vector_dtype`` and a range of
+``truncate_dim`` values, with and without re-scoring, and reports index
+memory and recall@k against exact float32 search.
+
+    python benchmarks/quantization.py --chunks 200000 --dim 256
+    python benchmarks/quantization.py --chunks 20000 --model nomic-ai/nomic-embed-text-v1.5
+
+Truncation only preserves ranking for Matryoshka-trained models; with the
+default hashed embeddings it shows the worst case.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ann_recall import embed, synthetic_chunks, VERBS, NOUNS
+from scaledown.optimizer.ann_index import VectorSearch
+
+
+def tie_aware_recall(found, vectors, queries, kth_distance):
+    """Share of results at least as close as the exact k-th neighbour (the corpus has many duplicates)."""
+    hits = []
+    for row, query, limit in zip(found, queries, kth_distance):
+        valid = row[row >= 0]
+        exact = ((vectors[valid] - query) ** 2).sum(axis=1)
+        hits.append(np.sum(exact <= limit + 1e-5) / len(row))
+    return float(np.mean(hits))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=256, help="Embedding size when hashing")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--model", help="SentenceTransformer model to embed with instead of hashing")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"Embedding {args.chunks} chunks...")
+    vectors = embed(list(synthetic_chunks(args.chunks)), args)
+    queries = embed([f"{v} the {n}" for v, n in zip(VERBS * 100, NOUNS[::-1] * 100)][:args.queries], args)
+    dim = vectors.shape[1]
+
+    baseline = VectorSearch(vectors)
+    truth_distances, _ = baseline.search(queries, args.k)
+    kth_distance = truth_distances[:, -1]
+    baseline_mb = baseline.memory_bytes / 2 ** 20
+
+    print(f"\n{'dtype':<9}{'dim':>6}{'rescore':>9}{'memory MB':>11}{'vs f32':>8}{'query ms':>10}{'recall@' + str(args.k):>11}")
+    for dtype in ("float32", "float16", "int8"):
+        for truncate_dim in (None, dim // 2, dim // 4):
+            for rescore_factor in (0, args.rescore_factor):
+                search = VectorSearch(vectors, args.index_type, None, dtype, truncate_dim, rescore_factor)
+                if rescore_factor and not search.rescore:
+                    continue
+                start = time.perf_counter()
+                _, found = search.search(queries, args.k)
+                query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+                memory_mb = search.memory_bytes / 2 ** 20
+                print(
+                    f"{dtype:<9}{truncate_dim or dim:>6}{'yes' if search.rescore else 'no':>9}"
+                    f"{memory_mb:>11.1f}{memory_mb / baseline_mb:>8.2f}{query_ms:>10.3f}"
+                    f"{tie_aware_recall(found, vectors, queries, kth_distance):>11.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,9 @@ from typing import Optional
 from scaledown.config import set_api_key, get_api_key
 
 # Core Components
-from scaledown.pipeline import Pipeline, make_pipeline
+from scaledown.pipeline import Pipeline, OptimizerUnion, make_pipeline
+from scaledown.cache import StepCache
+from scaledown.callbacks import PipelineCallback, OpenTelemetryCallback
 # HasteOptimizer is optional, import from scaledown.optimizer if needed
 from scaledown.compressor.scaledown_compressor import ScaleDownCompressor
 
@@ -14,7 +16,11 @@ from scaledown.types import (
     CompressedPrompt,
     OptimizedContext,
     PipelineResult,
-    StepMetadata
+    StepMetadata,
+    ContextSource,
+    FileSource,
+    MmapSource,
+    BytesSource
 )
 
 from scaledown.exceptions import (
@@ -28,7 +34,11 @@ _API_KEY: Optional[str] = os.environ.get("SCALEDOWN_API_KEY")
 
 __all__ = [
     "Pipeline",
+    "OptimizerUnion",
     "make_pipeline",
+    "StepCache",
+    "PipelineCallback",
+    "OpenTelemetryCallback",
     "ScaleDownCompressor",
     "set_api_key",
     "get_api_key",
@@ -36,6 +46,10 @@ __all__ = [
     "StepMetadata",
     "CompressedPrompt",
     "OptimizedContext",
+    "ContextSource",
+    "FileSource",
+    "MmapSource",
+    "BytesSource",
     "ScaleDownError",
     "AuthenticationError",
     "APIError"
@@ -0,0 +1,268 @@
+"""
+On-disk memoization of pipeline steps.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import types
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from scaledown.types import StepMetadata, ContextSource
+
+# Attributes that never influence a step's output: credentials, and caches
+# whose hits equal what would be computed
+_IGNORED_ATTRIBUTES = {"api_key", "embedding_cache", "query_cache"}
+
+# Nesting depth after which configuration values are described by class only
+_MAX_DEPTH = 8
+
+
+class _Unfingerprintable(Exception):
+    """A step holds a value whose effect on its output cannot be described."""
+
+
+def _qualname(value: Any) -> str:
+    return f"{getattr(value, '__module__', None)}.{getattr(value, '__qualname__', type(value).__qualname__)}"
+
+
+def _code_fingerprint(code: types.CodeType) -> str:
+    """Hash of a code object's bytecode, names and constants, nested functions included."""
+    digest = hashlib.sha256(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            digest.update(_code_fingerprint(const).encode())
+        elif isinstance(const, frozenset):
+            # Set literals' order depends on string hash randomization
+            digest.update(repr(sorted(map(repr, const))).encode())
+        else:
+            digest.update(repr(const).encode())
+    return digest.hexdigest()
+
+
+def _global_names(code: types.CodeType) -> Iterator[str]:
+    yield from code.co_names
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from _global_names(const)
+
+
+def _callable_fingerprint(fn: Any, depth: int) -> Dict[str, Any]:
+    """
+    Describe a plain function, bound method or ``functools.partial`` by its
+    code and everything that parametrizes it: bound arguments, defaults,
+    closure cells and the module globals it reads.
+    """
+    if isinstance(fn, functools.partial):
+        return {
+            "partial": _value_fingerprint(fn.func, depth),
+            "args": _value_fingerprint(fn.args, depth),
+            "keywords": _value_fingerprint(fn.keywords, depth),
+        }
+    if inspect.ismethod(fn):
+        return {"method": _callable_fingerprint(fn.__func__, depth), "self": _value_fingerprint(fn.__self__, depth)}
+
+    code = fn.__code__
+    fingerprint: Dict[str, Any] = {"function": _qualname(fn), "code": _code_fingerprint(code)}
+    if depth >= _MAX_DEPTH:
+        # Recursive functions reach themselves through their globals
+        return fingerprint
+
+    cells = []
+    for cell in fn.__closure__ or ():
+        try:
+            cells.append(_value_fingerprint(cell.cell_contents, depth + 1))
+        except ValueError:
+            raise _Unfingerprintable(f"{_qualname(fn)} reads a closure variable that is not yet bound")
+    fn_globals = getattr(fn, "__globals__", {})
+    fingerprint.update(
+        defaults=_value_fingerprint(fn.__defaults__ or (), depth + 1),
+        kwdefaults=_value_fingerprint(fn.__kwdefaults__ or {}, depth + 1),
+        closure=cells,
+        globals={
+            name: _global_fingerprint(fn_globals[name], depth + 1)
+            for name in sorted(set(_global_names(code))) if name in fn_globals
+        },
+    )
+    return fingerprint
+
+
+def _global_fingerprint(value: Any, depth: int) -> Any:
+    """Module globals read by a function: data and code in full, other objects (loggers, clients) by class."""
+    if isinstance(value, types.ModuleType):
+        return f"module:{value.__name__}"
+    if value is None or isinstance(value, (bool, int, float, str, bytes, list, tuple, set, frozenset, dict, type)):
+        return _value_fingerprint(value, depth)
+    if callable(value) and (hasattr(value, "__code__") or isinstance(value, functools.partial)):
+        return _callable_fingerprint(value, depth)
+    return _qualname(type(value))
+
+
+def _component_fingerprint(component: Any, _depth: int = 0) -> Dict[str, Any]:
+    """Describe a step by its class and public configuration, recursively."""
+    if not isinstance(component, type) and (
+        hasattr(component, "__code__") or isinstance(component, functools.partial)
+    ):
+        # Plain functions and lambdas share a class, so tell them apart by body and bindings
+        return _callable_fingerprint(component, _depth)
+    if isinstance(component, (types.BuiltinFunctionType, types.MethodDescriptorType, types.WrapperDescriptorType)):
+        return {"builtin": _qualname(component)}
+
+    cls = component if isinstance(component, type) else component.__class__
+    fingerprint: Dict[str, Any] = {"class": f"{cls.__module__}.{cls.__qualname__}"}
+    if not isinstance(component, type) and not hasattr(component, "__dict__"):
+        raise _Unfingerprintable(f"{cls.__qualname__} has no inspectable configuration")
+
+    if _depth < _MAX_DEPTH:
+        config = dict(getattr(component, "__dict__", {}))
+        if not isinstance(component, type):
+            # Settable properties are configuration kept under a private name, e.g. model_name
+            for key in dir(cls):
+                if key.startswith("_"):
+                    continue
+                attr = getattr(cls, key, None)
+                if isinstance(attr, property) and attr.fset is not None:
+                    config[key] = getattr(component, key)
+        fingerprint["config"] = {
+            key: _value_fingerprint(value, _depth + 1)
+            for key, value in config.items()
+            if not key.startswith("_") and key not in _IGNORED_ATTRIBUTES
+        }
+    return fingerprint
+
+
+def _value_fingerprint(value: Any, depth: int) -> Any:
+    """
+    JSON-safe description of a configuration value that is stable across
+    calls and processes: objects are described by their own configuration,
+    never by a ``repr`` that may contain addresses or runtime counters.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    if isinstance(value, (list, tuple)):
+        return [_value_fingerprint(v, depth) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(json.dumps(_value_fingerprint(v, depth), sort_keys=True) for v in value)
+    if isinstance(value, dict):
+        return {str(k): _value_fingerprint(v, depth) for k, v in value.items()}
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    # Objects that know what identifies their contents, e.g. context sources and indexes
+    fingerprint = getattr(value, "fingerprint", None)
+    if callable(fingerprint):
+        return {"class": f"{type(value).__module__}.{type(value).__qualname__}",
+                "fingerprint": _value_fingerprint(fingerprint(), depth)}
+    return _component_fingerprint(value, depth)
+
+
+def _file_fingerprint(path: Any) -> Optional[Tuple[int, int]]:
+    """Identify the contents of a file passed by path, without reading it."""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class StepCache:
+    """
+    Disk-backed cache of pipeline step outputs.
+
+    Each entry is keyed by a fingerprint of the step's input content, its
+    class and its public configuration (e.g. ``HasteOptimizer.top_k`` or
+    ``ScaleDownCompressor.rate``, including that of nested components such
+    as ``OptimizerUnion`` branches) plus the run arguments. Function steps
+    are identified by their code, defaults, closure variables, the module
+    globals they read, and ``functools.partial`` arguments. Changing one step
+    only invalidates that step and the ones after it.
+
+    Parameters
+    ----------
+    location : str
+        Directory where cached outputs are stored. Created if missing.
+
+    Example
+    -------
+    >>> pipe = Pipeline(steps, memory=StepCache(".scaledown_cache"))
+    >>> pipe.run(context=code, query="auth flow", prompt="Explain")  # computes
+    >>> pipe.run(context=code, query="auth flow", prompt="Explain")  # served from disk
+    """
+
+    def __init__(self, location: str):
+        self.location = os.path.abspath(os.path.expanduser(location))
+        os.makedirs(self.location, exist_ok=True)
+
+    def key(self, component: Any, context: str, kwargs: Dict[str, Any]) -> Optional[str]:
+        """
+        Compute the cache key for running ``component`` on ``context``.
+
+        Returns None when the step holds a value that cannot be fingerprinted,
+        e.g. an unbound closure cell or an object without ``__dict__``; such
+        steps are never cached.
+        """
+        run_args = dict(kwargs)
+        if run_args.get("file_path"):
+            run_args["file_path"] = (run_args["file_path"], _file_fingerprint(run_args["file_path"]))
+
+        if isinstance(context, ContextSource):
+            # Identify sources without reading them into memory
+            context_fingerprint = context.fingerprint()
+        else:
+            context_fingerprint = hashlib.sha256(str(context).encode("utf-8")).hexdigest()
+
+        try:
+            component_fingerprint = _component_fingerprint(component)
+        except _Unfingerprintable:
+            return None
+
+        payload = json.dumps(
+            {
+                "component": component_fingerprint,
+                "kwargs": run_args,
+                "context": context_fingerprint,
+            },
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.location, key[:2], f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Tuple[str, StepMetadata]]:
+        """Return the cached ``(output, metadata)`` pair, or None on a miss."""
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key: str, output: str, metadata: StepMetadata) -> None:
+        """Store a step's output and metadata under ``key``."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so concurrent readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((output, metadata), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        shutil.rmtree(self.location, ignore_errors=True)
+        os.makedirs(self.location, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f"StepCache(location={self.location!r})"
@@ -0,0 +1,169 @@
+"""
+Instrumentation hooks for Pipeline execution.
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from scaledown.types import PipelineResult, StepMetadata
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineCallback:
+    """
+    Base class for pipeline instrumentation.
+
+    Subclass and override the hooks you need; every hook is a no-op by
+    default. Hooks run synchronously in the thread executing the step, so
+    keep them cheap. With ``Pipeline.stream`` only the step hooks fire, from
+    each step's worker thread.
+
+    Example
+    -------
+    >>> class PrintProgress(PipelineCallback):
+    ...     def on_step_end(self, step_name, component, metadata):
+    ...         print(step_name, metadata.output_tokens, metadata.details["wall_ms"])
+    >>>
+    >>> pipe = Pipeline(steps, callbacks=[PrintProgress()])
+    """
+
+    def on_run_start(self, pipeline: Any, context: str) -> None:
+        """Called before the first step of ``Pipeline.run``."""
+
+    def on_run_end(self, pipeline: Any, result: PipelineResult) -> None:
+        """Called after ``Pipeline.run`` completes."""
+
+    def on_run_error(self, pipeline: Any, error: BaseException) -> None:
+        """Called when ``Pipeline.run`` fails."""
+
+    def on_step_start(self, step_name: str, component: Any) -> None:
+        """Called before a step executes."""
+
+    def on_step_end(self, step_name: str, component: Any, metadata: StepMetadata) -> None:
+        """
+        Called after a step completes.
+
+        ``metadata`` carries the step's token counts and latency. Its
+        ``details["wall_ms"]`` is the total time spent in the step, including
+        time outside the component's own ``latency_ms``.
+        """
+
+    def on_step_error(self, step_name: str, component: Any, error: BaseException) -> None:
+        """Called when a step raises."""
+
+
+class OpenTelemetryCallback(PipelineCallback):
+    """
+    Emit an OpenTelemetry span for every pipeline run and step.
+
+    Step spans are children of the run span, which itself nests under
+    whatever span is current when ``Pipeline.run`` is called. Each span is
+    the current span while it runs, so spans a step creates itself (e.g.
+    instrumented HTTP calls) nest under its step span. Token counts,
+    latency and cache/skip markers are recorded as span attributes.
+
+    Parameters
+    ----------
+    tracer : opentelemetry.trace.Tracer, optional
+        Tracer used to create spans. Defaults to the global tracer provider's
+        ``'scaledown'`` tracer.
+
+    Example
+    -------
+    >>> pipe = Pipeline(steps, callbacks=[OpenTelemetryCallback()])
+    """
+
+    def __init__(self, tracer: Optional[Any] = None):
+        try:
+            from opentelemetry import context, trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryCallback requires 'opentelemetry-api'. "
+                "Install it with: pip install opentelemetry-api"
+            ) from e
+
+        self._trace = trace
+        self._context = context
+        self.tracer = tracer or trace.get_tracer("scaledown")
+        self._local = threading.local()
+
+    def _spans(self) -> Dict[str, Any]:
+        if not hasattr(self._local, "spans"):
+            self._local.spans = {}
+        return self._local.spans
+
+    def on_run_start(self, pipeline: Any, context: str) -> None:
+        span = self.tracer.start_span("scaledown.pipeline.run")
+        span.set_attribute("scaledown.pipeline.steps", [name for name, _ in pipeline.steps])
+        self._local.run_span = span
+        self._local.run_token = self._activate(span)
+
+    def on_run_end(self, pipeline: Any, result: PipelineResult) -> None:
+        span = getattr(self._local, "run_span", None)
+        if span is None:
+            return
+        span.set_attribute("scaledown.input_tokens", result.original_tokens)
+        span.set_attribute("scaledown.output_tokens", result.final_tokens)
+        self._end_run(span)
+
+    def on_run_error(self, pipeline: Any, error: BaseException) -> None:
+        span = getattr(self._local, "run_span", None)
+        if span is None:
+            return
+        self._record_error(span, error)
+        self._end_run(span)
+
+    def on_step_start(self, step_name: str, component: Any) -> None:
+        run_span = getattr(self._local, "run_span", None)
+        parent = self._trace.set_span_in_context(run_span) if run_span is not None else None
+        span = self.tracer.start_span(f"scaledown.step.{step_name}", context=parent)
+        span.set_attribute("scaledown.step.name", step_name)
+        span.set_attribute("scaledown.step.component", component.__class__.__name__)
+        self._spans()[step_name] = (span, self._activate(span))
+
+    def on_step_end(self, step_name: str, component: Any, metadata: StepMetadata) -> None:
+        entry = self._spans().pop(step_name, None)
+        if entry is None:
+            return
+        span, token = entry
+        self._context.detach(token)
+        span.set_attribute("scaledown.step.type", metadata.details.get("type", "custom"))
+        span.set_attribute("scaledown.input_tokens", metadata.input_tokens)
+        span.set_attribute("scaledown.output_tokens", metadata.output_tokens)
+        span.set_attribute("scaledown.latency_ms", float(metadata.latency_ms))
+        for flag in ("cached", "skipped"):
+            if metadata.details.get(flag):
+                span.set_attribute(f"scaledown.step.{flag}", True)
+        span.end()
+
+    def on_step_error(self, step_name: str, component: Any, error: BaseException) -> None:
+        entry = self._spans().pop(step_name, None)
+        if entry is None:
+            return
+        span, token = entry
+        self._context.detach(token)
+        self._record_error(span, error)
+        span.end()
+
+    def _activate(self, span: Any) -> Any:
+        """Make ``span`` current in this thread; returns the token to restore the previous context."""
+        return self._context.attach(self._trace.set_span_in_context(span))
+
+    def _end_run(self, span: Any) -> None:
+        self._context.detach(self._local.run_token)
+        span.end()
+        self._local.run_span = self._local.run_token = None
+
+    def _record_error(self, span: Any, error: BaseException) -> None:
+        span.record_exception(error)
+        span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(error)))
+
+
+def _emit(callbacks: List[PipelineCallback], hook: str, *args: Any) -> None:
+    """Invoke ``hook`` on every callback. A failing callback never fails the pipeline."""
+    for callback in callbacks:
+        try:
+            getattr(callback, hook)(*args)
+        except Exception:
+            logger.exception(f"Pipeline callback {callback.__class__.__name__}.{hook} failed")
@@ -5,20 +5,28 @@ from concurrent.futures import ThreadPoolExecutor
 from .base import BaseCompressor
 from ..exceptions import AuthenticationError, APIError
 from ..types import CompressedPrompt
+from ..deadline import remaining_time
 from .config import get_api_url
 
+# Floor for HTTP timeouts derived from an almost expired deadline
+_MIN_REQUEST_TIMEOUT = 0.001
+
 class ScaleDownCompressor(BaseCompressor):
     """
     Standard ScaleDown compressor using the hosted model on API.
+
+    ``timeout`` bounds each HTTP request in seconds. Inside a pipeline with a
+    deadline, requests are also bounded by the time remaining.
     """
     def __init__(self, target_model='gpt-4o', rate='auto', api_key=None, 
-                 temperature=None, preserve_keywords=False, preserve_words=None):
+                 temperature=None, preserve_keywords=False, preserve_words=None, timeout=None):
         super().__init__(rate=rate, api_key=api_key)
         self.api_url = get_api_url()
         self.target_model = target_model
         self.temperature = temperature
         self.preserve_keywords = preserve_keywords
         self.preserve_words = preserve_words or []
+        self.timeout = timeout
 
     def compress(self, context: Union[str, List[str]], prompt: Union[str, List[str]], 
                  max_tokens: int = None, **kwargs) -> Union[CompressedPrompt, List[CompressedPrompt]]:
@@ -77,7 +85,8 @@ class ScaleDownCompressor(BaseCompressor):
             response = requests.post(
                  full_url,
                  headers=headers,
-                 json=payload
+                 json=payload,
+                 timeout=self._request_timeout()
             )
             response.raise_for_status()
             data = response.json()
@@ -104,3 +113,10 @@ class ScaleDownCompressor(BaseCompressor):
 
         except requests.exceptions.RequestException as e:
             raise APIError(f"Connection failed: {str(e)}")
+
+    def _request_timeout(self):
+        """HTTP timeout: the tighter of ``self.timeout`` and the remaining deadline."""
+        limits = [t for t in (self.timeout, remaining_time()) if t is not None]
+        if not limits:
+            return None
+        return max(min(limits), _MIN_REQUEST_TIMEOUT)
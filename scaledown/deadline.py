@@ -0,0 +1,56 @@
+"""
+Request deadlines shared between a Pipeline and the steps it runs.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Absolute time.monotonic() value by which the current request must finish
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("scaledown_deadline", default=None)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    Seconds left before the current deadline, or None if there is none.
+
+    Steps call this to bound blocking work, e.g. ``ScaleDownCompressor``
+    uses it as the HTTP timeout. The result can be zero or negative once the
+    deadline has passed.
+    """
+    at = _DEADLINE.get()
+    if at is None:
+        return None
+    return at - time.monotonic()
+
+
+@contextmanager
+def deadline_at(at: Optional[float]) -> Iterator[None]:
+    """Apply an absolute ``time.monotonic()`` deadline, keeping any earlier one."""
+    current = _DEADLINE.get()
+    if at is None or (current is not None and current <= at):
+        yield
+        return
+
+    token = _DEADLINE.set(at)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Limit everything run inside the block to ``seconds``.
+
+    Deadlines nest: an inner deadline never extends an outer one.
+
+    Example
+    -------
+    >>> from scaledown.deadline import deadline
+    >>> with deadline(2.0):
+    ...     result = pipe.run(context=code, query="auth flow", prompt="Explain")
+    """
+    with deadline_at(None if seconds is None else time.monotonic() + seconds):
+        yield
@@ -3,7 +3,12 @@ from typing import TYPE_CHECKING
 from .base import BaseOptimizer
 
 # Define what to expose
-__all__ = ["BaseOptimizer", "HasteOptimizer", "SemanticOptimizer"]
+__all__ = [
+    "BaseOptimizer", "HasteOptimizer", "SemanticOptimizer", "EmbeddingCache", "QueryEmbeddingCache",
+    "query_embedding_cache", "RepositoryIndex",
+    "ModelRegistry", "model_registry", "BaseEncoder", "MultiProcessEncoder", "HashingEncoder",
+    "TfidfProjectionEncoder",
+]
 
 def __getattr__(name):
     if name == "HasteOptimizer":
@@ -24,8 +29,38 @@ def __getattr__(name):
                 "SemanticOptimizer requires 'semantic'. Install with `pip install scaledown[semantic]`"
             ) from e
             
+    if name in ("EmbeddingCache", "QueryEmbeddingCache", "query_embedding_cache"):
+        try:
+            from . import embedding_cache
+            return getattr(embedding_cache, name)
+        except ImportError as e:
+            raise ImportError(
+                f"{name} requires 'numpy'. Install with `pip install scaledown[semantic]`"
+            ) from e
+
+    if name in ("ModelRegistry", "model_registry"):
+        from . import registry
+        return getattr(registry, name)
+
+    if name in ("BaseEncoder", "MultiProcessEncoder", "HashingEncoder", "TfidfProjectionEncoder"):
+        from . import encoders
+        return getattr(encoders, name)
+
+    if name == "RepositoryIndex":
+        try:
+            from .semantic_index import RepositoryIndex
+            return RepositoryIndex
+        except ImportError as e:
+            raise ImportError(
+                "RepositoryIndex requires 'semantic'. Install with `pip install scaledown[semantic]`"
+            ) from e
+
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if TYPE_CHECKING:
     from .haste import HasteOptimizer
     from .semantic_code import SemanticOptimizer
+    from .embedding_cache import EmbeddingCache, QueryEmbeddingCache, query_embedding_cache
+    from .semantic_index import RepositoryIndex
+    from .registry import ModelRegistry, model_registry
+    from .encoders import BaseEncoder, MultiProcessEncoder, HashingEncoder, TfidfProjectionEncoder
@@ -0,0 +1,221 @@
+"""
+Configurable FAISS indexes for semantic retrieval.
+"""
+import logging
+import math
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+# FAISS k-means wants at least this many training points per centroid
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def _default_nlist(n: int) -> int:
+    return max(1, int(4 * math.sqrt(n)))
+
+
+def _pq_subquantizers(d: int, requested: Optional[int]) -> int:
+    """Largest divisor of ``d`` not above the requested number of sub-quantizers."""
+    m = min(requested or max(1, d // 8), d)
+    while d % m:
+        m -= 1
+    return m
+
+
+def build_index(
+    vectors: np.ndarray,
+    index_type: str = "flat",
+    nlist: Optional[int] = None,
+    nprobe: int = 8,
+    hnsw_m: int = 32,
+    ef_construction: int = 40,
+    ef_search: int = 64,
+    pq_m: Optional[int] = None,
+    pq_nbits: int = 8,
+    vector_dtype: str = "float32",
+) -> Tuple[Any, str]:
+    """
+    Build and fill a FAISS index over ``vectors``.
+
+    Parameters
+    ----------
+    vectors : np.ndarray
+        float32 matrix of shape ``(n, d)``.
+    index_type : str, default='flat'
+        ``'flat'`` (exact), ``'ivf'`` (inverted lists), ``'hnsw'`` (graph) or
+        ``'ivfpq'`` (inverted lists with product-quantized, compressed vectors).
+    nlist : int, optional
+        Number of IVF lists. Defaults to ``4 * sqrt(n)``.
+    nprobe : int, default=8
+        IVF lists visited per query; higher is slower and more accurate.
+    hnsw_m : int, default=32
+        Neighbours per HNSW node.
+    ef_construction, ef_search : int
+        HNSW beam width while building and while searching.
+    pq_m : int, optional
+        PQ sub-quantizers, rounded down to a divisor of ``d``. Defaults to ``d // 8``.
+    pq_nbits : int, default=8
+        Bits per PQ code.
+    vector_dtype : str, default='float32'
+        Storage precision of ``flat``, ``ivf`` and ``hnsw`` indexes:
+        ``'float16'`` halves memory and ``'int8'`` (scalar quantization)
+        quarters it. ``ivfpq`` is already compressed and ignores it.
+
+    Returns
+    -------
+    Tuple[faiss.Index, str]
+        The index and the type actually built. IVF and PQ indexes need
+        enough vectors to train; smaller inputs fall back to ``'flat'``.
+    """
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {index_type!r}")
+    if vector_dtype not in VECTOR_DTYPES:
+        raise ValueError(f"vector_dtype must be one of {VECTOR_DTYPES}, got {vector_dtype!r}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+
+    if index_type in ("ivf", "ivfpq"):
+        nlist = min(nlist or _default_nlist(n), n // _MIN_POINTS_PER_CENTROID)
+        if index_type == "ivfpq" and n < 2 ** pq_nbits:
+            nlist = 0
+        if nlist < 1:
+            logger.debug(f"{n} vectors are too few to train '{index_type}'; using an exact index")
+            index_type = "flat"
+
+    qtype = None
+    if vector_dtype != "float32":
+        qtype = faiss.ScalarQuantizer.QT_fp16 if vector_dtype == "float16" else faiss.ScalarQuantizer.QT_8bit
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(d) if qtype is None else faiss.IndexScalarQuantizer(d, qtype, faiss.METRIC_L2)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m) if qtype is None else faiss.IndexHNSWSQ(d, qtype, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+    else:
+        quantizer = faiss.IndexFlatL2(d)
+        if index_type == "ivfpq":
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, _pq_subquantizers(d, pq_m), pq_nbits)
+        elif qtype is None:
+            index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, d, nlist, qtype, faiss.METRIC_L2)
+        index.nprobe = min(nprobe, nlist)
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index, index_type
+
+
+def index_memory_bytes(index: Any) -> int:
+    """Serialized size of a FAISS index, a close proxy for its resident memory."""
+    import faiss
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def _is_normalized(vectors: np.ndarray) -> bool:
+    sample = np.asarray(vectors[:256], dtype=np.float32)
+    return bool(len(sample)) and np.allclose(np.linalg.norm(sample, axis=1), 1.0, atol=1e-3)
+
+
+class VectorSearch:
+    """
+    Nearest-neighbour search over vectors stored at reduced size.
+
+    The FAISS index holds the first ``truncate_dim`` dimensions of each
+    vector (Matryoshka-style truncation, renormalized when the embeddings
+    are unit-length) at ``vector_dtype`` precision. When either reduces
+    fidelity, ``rescore_factor * k`` candidates are fetched and re-ranked
+    by exact L2 distance against the full float32 ``vectors``, which may
+    be a memory map so only the candidates' rows are read.
+
+    Parameters
+    ----------
+    vectors : np.ndarray
+        Full-precision float32 vectors; kept by reference for re-scoring.
+    index_type : str, default='flat'
+        Passed to ``build_index``.
+    index_params : dict, optional
+        Extra ``build_index`` arguments.
+    vector_dtype : str, default='float32'
+        'float32', 'float16' or 'int8'.
+    truncate_dim : int, optional
+        Keep only this many leading dimensions in the index.
+    rescore_factor : int, default=4
+        Candidates fetched per result when re-scoring. 0 disables re-scoring.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        index_type: str = "flat",
+        index_params: Optional[Dict[str, Any]] = None,
+        vector_dtype: str = "float32",
+        truncate_dim: Optional[int] = None,
+        rescore_factor: int = 4,
+    ):
+        self.vectors = vectors
+        dim = vectors.shape[1]
+        self.truncate_dim = truncate_dim if truncate_dim and truncate_dim < dim else None
+        self._renormalize = self.truncate_dim is not None and _is_normalized(vectors)
+        self.rescore = bool(rescore_factor) and (vector_dtype != "float32" or self.truncate_dim is not None)
+        self.rescore_factor = rescore_factor
+        self.vector_dtype = vector_dtype
+
+        self.index, self.index_type = build_index(
+            self._reduce(vectors), index_type, vector_dtype=vector_dtype, **(index_params or {})
+        )
+        # Index size excluding the re-scoring vectors; measured once, as the index never changes
+        self.memory_bytes = index_memory_bytes(self.index)
+
+    def _reduce(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.truncate_dim is None:
+            return vectors
+        reduced = np.ascontiguousarray(vectors[:, :self.truncate_dim])
+        if self._renormalize:
+            reduced /= np.linalg.norm(reduced, axis=1, keepdims=True) + 1e-12
+        return reduced
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(distances, positions)`` like ``faiss.Index.search``; missing results are -1."""
+        queries = np.asarray(queries, dtype=np.float32)
+        k = min(k, len(self.vectors))
+        if not self.rescore:
+            return self.index.search(self._reduce(queries), k)
+
+        n_candidates = min(len(self.vectors), k * self.rescore_factor)
+        _, candidates = self.index.search(self._reduce(queries), n_candidates)
+
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        positions = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, (query, found) in enumerate(zip(queries, candidates)):
+            found = np.sort(found[found >= 0])
+            if not len(found):
+                continue
+            full = np.asarray(self.vectors[found], dtype=np.float32)
+            exact = ((full - query) ** 2).sum(axis=1)
+            best = np.argsort(exact, kind="stable")[:k]
+            distances[row, :len(best)] = exact[best]
+            positions[row, :len(best)] = found[best]
+        return distances, positions
+
+    def details(self) -> Dict[str, Any]:
+        """Storage settings and memory for ``OptimizerMetrics.details``."""
+        return {
+            "index_type": self.index_type,
+            "vector_dtype": self.vector_dtype,
+            "embedding_dim": self.truncate_dim or self.vectors.shape[1],
+            "index_memory_bytes": self.memory_bytes,
+            "rescored": self.rescore,
+        }
@@ -6,7 +6,11 @@ class BaseOptimizer(ABC):
     """
     Base class for all context optimizers.
     Optimizers process raw context before compression.
+
+    Optimizers that read ``ContextSource`` inputs natively set
+    ``supports_context_sources = True``; all others receive the decoded text.
     """
+    supports_context_sources = False
     
     def __init__(self, api_key: Optional[str] = None, target_model:str="gpt-4o", **kwargs):
         """
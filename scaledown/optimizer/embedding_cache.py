@@ -0,0 +1,313 @@
+"""
+Persistent chunk-embedding cache for SemanticOptimizer.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: stores are still shared within the process
+    fcntl = None
+
+# Rows allocated when a store is first created
+_INITIAL_CAPACITY = 1024
+
+# One store per model directory, shared by every EmbeddingCache in the process
+_shared_stores: Dict[str, "_ModelStore"] = {}
+_shared_stores_lock = threading.Lock()
+
+
+def content_hash(text: str) -> str:
+    """Stable identifier of a chunk's content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _ModelStore:
+    """
+    Vectors for one model: a memory-mapped ``vectors.npy`` plus an ``index.json`` of row numbers.
+
+    Appends hold an exclusive lock on ``.lock`` and first reload the index, so
+    processes sharing a directory add rows after each other's instead of
+    overwriting them.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock_path = os.path.join(directory, ".lock")
+        self.lock = threading.Lock()
+        self.rows: Dict[str, int] = {}
+        self.count = 0
+        self.vectors = None
+        self._index_stat = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reload the index and vectors if another writer replaced ``index.json``."""
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return
+        stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stat == self._index_stat or not os.path.exists(self.vectors_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        # index.json is written after the rows it lists, so the vectors file covers them
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+        self.rows = meta["rows"]
+        self.count = meta["count"]
+        self._index_stat = stat
+
+    def missing(self, keys: Sequence[str]) -> List[int]:
+        """Positions of ``keys`` that have no stored vector."""
+        self.refresh()
+        return [i for i, key in enumerate(keys) if key not in self.rows]
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._file_lock():
+            self.refresh()
+            new = [(k, v) for k, v in zip(keys, vectors) if k not in self.rows]
+            if not new:
+                return
+            self._reserve(self.count + len(new), vectors.shape[1])
+            for key, vector in new:
+                self.vectors[self.count] = vector
+                self.rows[key] = self.count
+                self.count += 1
+            self.vectors.flush()
+            self._write_index()
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _reserve(self, size: int, dim: int) -> None:
+        if self.vectors is not None and self.vectors.shape[1] != dim:
+            raise ValueError(
+                f"Embedding dimension changed from {self.vectors.shape[1]} to {dim}; "
+                "clear the cache for this model"
+            )
+        capacity = 0 if self.vectors is None else self.vectors.shape[0]
+        if size <= capacity:
+            return
+
+        new_capacity = max(_INITIAL_CAPACITY, capacity * 2, size)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+        os.close(fd)
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(new_capacity, dim))
+        if self.count:
+            grown[:self.count] = self.vectors[:self.count]
+        grown.flush()
+        del grown
+        self.vectors = None
+        os.replace(tmp_path, self.vectors_path)
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+    def _write_index(self) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "rows": self.rows}, f)
+        os.replace(tmp_path, self.index_path)
+        st = os.stat(self.index_path)
+        self._index_stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of chunk embeddings, keyed by model name and chunk content hash.
+
+    Vectors are stored per model as a memory-mapped NumPy array with a JSON
+    index of content hashes, so only new or edited chunks are embedded on
+    repeat calls and the cache survives restarts. Caches opened on the same
+    directory share their stores, and appends are serialized with a file
+    lock, so several instances or processes can use one directory.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding one sub-directory per model.
+
+    Example
+    -------
+    >>> opt = SemanticOptimizer(embedding_cache="~/.cache/scaledown/embeddings")
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self._stores: Dict[str, _ModelStore] = {}
+
+    def _store(self, model_name: str) -> _ModelStore:
+        store = self._stores.get(model_name)
+        if store is None:
+            safe_name = re.sub(r"[^\w.-]", "_", model_name)
+            directory = os.path.realpath(os.path.join(self.cache_dir, safe_name))
+            with _shared_stores_lock:
+                store = _shared_stores.get(directory)
+                if store is None:
+                    store = _shared_stores[directory] = _ModelStore(directory)
+            self._stores[model_name] = store
+        return store
+
+    def encode(
+        self,
+        model_name: str,
+        texts: Sequence[str],
+        encode_fn: Callable[[List[str]], np.ndarray]
+    ) -> Tuple[np.ndarray, Dict[str, int]]:
+        """
+        Return embeddings for ``texts``, calling ``encode_fn`` only for uncached ones.
+
+        Returns
+        -------
+        Tuple[np.ndarray, Dict[str, int]]
+            float32 embeddings in input order, and ``{"hits": ..., "misses": ...}``
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32), {"hits": 0, "misses": 0}
+
+        keys = [content_hash(t) for t in texts]
+        store = self._store(model_name)
+        with store.lock:
+            missing = store.missing(keys)
+
+        # Embed each distinct missing chunk once, outside the lock
+        first = {}
+        for i in missing:
+            first.setdefault(keys[i], i)
+        if first:
+            fresh = np.asarray(encode_fn([texts[i] for i in first.values()]), dtype=np.float32)
+
+        with store.lock:
+            if first:
+                store.add(list(first), fresh)
+            embeddings = np.array(store.vectors[[store.rows[k] for k in keys]], dtype=np.float32)
+        return embeddings, {"hits": len(keys) - len(missing), "misses": len(missing)}
+
+    def __len__(self) -> int:
+        return sum(store.count for store in self._stores.values())
+
+    def __repr__(self) -> str:
+        return f"EmbeddingCache(cache_dir={self.cache_dir!r})"
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded in-memory LRU of query embeddings, keyed by model name and query.
+
+    Queries are normalized by trimming and collapsing whitespace (case is
+    kept, since most embedding models are case-sensitive), so repeated
+    questions skip the model entirely. One instance, ``query_embedding_cache``,
+    is shared by every ``SemanticOptimizer`` in the process; because keys
+    include the model name, optimizers on the same model share entries.
+
+    Parameters
+    ----------
+    maxsize : int, default=4096
+        Queries kept across all models before the least recently used is dropped.
+
+    Example
+    -------
+    >>> from scaledown.optimizer import query_embedding_cache
+    >>> query_embedding_cache.hit_rate
+    0.93
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Hashable, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split())
+
+    def encode(
+        self,
+        model_name: Hashable,
+        queries: Sequence[str],
+        encode_fn: Callable[[List[str]], np.ndarray]
+    ) -> Tuple[np.ndarray, Dict[str, int]]:
+        """
+        Return embeddings for ``queries``, calling ``encode_fn`` once for the uncached ones.
+
+        Returns
+        -------
+        Tuple[np.ndarray, Dict[str, int]]
+            float32 embeddings in input order, and ``{"hits": ..., "misses": ...}``
+        """
+        keys = [(model_name, self.normalize(q)) for q in queries]
+        found: Dict[Tuple[Hashable, str], np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+
+        # Embed each distinct missing query once, outside the lock
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            fresh = np.asarray(encode_fn([k[1] for k in missing]), dtype=np.float32)
+            with self._lock:
+                for key, vector in zip(missing, fresh):
+                    vector.setflags(write=False)
+                    found[key] = self._entries[key] = vector
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+        hits = sum(1 for k in keys if k not in missing)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(keys) - hits
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32), {"hits": 0, "misses": 0}
+        return np.stack([found[k] for k in keys]), {"hits": hits, "misses": len(keys) - hits}
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of queries served from the cache since creation or the last ``clear``."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self, model_name: Optional[Hashable] = None) -> None:
+        """Drop cached queries for ``model_name``, or everything and the hit counters."""
+        with self._lock:
+            if model_name is None:
+                self._entries.clear()
+                self.hits = self.misses = 0
+            else:
+                for key in [k for k in self._entries if k[0] == model_name]:
+                    del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"QueryEmbeddingCache(maxsize={self.maxsize}, size={len(self)}, hit_rate={self.hit_rate:.2f})"
+
+
+#: Query cache shared by every SemanticOptimizer in the process
+query_embedding_cache = QueryEmbeddingCache()
@@ -0,0 +1,306 @@
+"""
+Embedding backends for SemanticOptimizer.
+"""
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from .lexical import identifier_tokens
+
+logger = logging.getLogger(__name__)
+
+_WARMUP_TEXT = "def warmup():\n    return None"
+
+
+class BaseEncoder(ABC):
+    """
+    Turns texts into embedding vectors.
+
+    ``name`` identifies the embedding space: it keys the embedding cache and
+    is checked against repository indexes, so two encoders must only share
+    a name if they produce interchangeable vectors.
+    """
+    name: str
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a float32 matrix with one row per text."""
+
+    def warmup(self) -> None:
+        """Prepare the encoder so the first real call is fast."""
+        self.encode([_WARMUP_TEXT])
+
+
+def _default_loader(model_name: str) -> Any:
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device="cpu")
+
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+
+
+def _init_worker(loader: Callable[[str], Any], model_name: str, threads: int, max_seq_length: Optional[int]) -> None:
+    # Thread pools read these on first use, so set them before torch starts
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    global _worker_model
+    _worker_model = loader(model_name)
+    if max_seq_length is not None:
+        _worker_model.max_seq_length = max_seq_length
+
+
+def _encode_shard(args) -> np.ndarray:
+    texts, batch_size = args
+    return np.asarray(
+        _worker_model.encode(texts, batch_size=batch_size, show_progress_bar=False),
+        dtype=np.float32,
+    )
+
+
+class MultiProcessEncoder(BaseEncoder):
+    """
+    Encodes with a pool of worker processes, one model copy per worker.
+
+    Texts are split into contiguous shards that workers encode in parallel,
+    which scales bulk indexing with the number of CPU cores on hosts
+    without a GPU. Each worker is limited to ``threads_per_process`` intra-op
+    threads so workers do not oversubscribe the cores.
+
+    Parameters
+    ----------
+    model_name : str
+        SentenceTransformer model loaded in every worker.
+    processes : int, optional
+        Worker count. Defaults to ``os.cpu_count() // threads_per_process``.
+    threads_per_process : int, default=1
+        Torch/BLAS threads per worker.
+    batch_size : int, default=32
+        Texts per forward pass inside a worker.
+    max_seq_length : int, optional
+        Truncate inputs to this many model tokens. Truncated vectors differ
+        from the full model's, so the length becomes part of ``name``, e.g.
+        ``"<model_name>-max512"``.
+    loader : callable, optional
+        Builds the model from ``model_name`` inside each worker. Must be
+        picklable; defaults to a CPU ``SentenceTransformer``.
+
+    Example
+    -------
+    >>> encoder = MultiProcessEncoder("Qwen/Qwen3-Embedding-0.6B", processes=8, max_seq_length=512)
+    >>> opt = SemanticOptimizer(encoder=encoder, index=".scaledown_index")
+    >>> opt.index_repository("path/to/repo")
+    >>> encoder.close()
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        processes: Optional[int] = None,
+        threads_per_process: int = 1,
+        batch_size: int = 32,
+        max_seq_length: Optional[int] = None,
+        loader: Optional[Callable[[str], Any]] = None,
+    ):
+        self.model_name = model_name
+        self.name = model_name if max_seq_length is None else f"{model_name}-max{max_seq_length}"
+        self.threads_per_process = threads_per_process
+        self.processes = processes or max(1, (os.cpu_count() or 1) // threads_per_process)
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length
+        self.loader = loader or _default_loader
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                logger.info(f"Starting {self.processes} encoder processes for {self.name}")
+                # Spawn, not fork: forking a process that already runs torch threads can deadlock
+                context = multiprocessing.get_context("spawn")
+                self._pool = context.Pool(
+                    self.processes,
+                    initializer=_init_worker,
+                    initargs=(self.loader, self.model_name, self.threads_per_process, self.max_seq_length),
+                )
+            return self._pool
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Even shards per worker, but small enough that slow shards do not stall the pool
+        shard_size = max(1, min(self.batch_size * 4, math.ceil(len(texts) / self.processes)))
+        shards = [(texts[i:i + shard_size], self.batch_size) for i in range(0, len(texts), shard_size)]
+        return np.vstack(self._get_pool().map(_encode_shard, shards, chunksize=1))
+
+    def warmup(self) -> None:
+        """Start the workers, which load their models, and run trial encodes."""
+        pool = self._get_pool()
+        pool.map(_encode_shard, [([_WARMUP_TEXT], 1)] * self.processes, chunksize=1)
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+    def __enter__(self) -> "MultiProcessEncoder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            f"MultiProcessEncoder({self.model_name!r}, processes={self.processes}, "
+            f"threads_per_process={self.threads_per_process}, batch_size={self.batch_size}, "
+            f"max_seq_length={self.max_seq_length})"
+        )
+
+
+# Frequent Python tokens that carry no meaning for retrieval
+_STOPWORDS = frozenset({
+    "and", "as", "class", "def", "elif", "else", "for", "from", "if", "import", "in",
+    "is", "none", "not", "or", "pass", "return", "self", "the", "true", "false",
+})
+
+
+@lru_cache(maxsize=1 << 16)
+def _term_hash(term: str) -> int:
+    # crc32 rather than hash(), which is salted per process
+    return zlib.crc32(term.encode("utf-8"))
+
+
+class HashingEncoder(BaseEncoder):
+    """
+    Deterministic bag-of-identifiers embeddings computed with NumPy.
+
+    Code is split into identifier parts (``parse_config`` and ``parseConfig``
+    both give ``parse``, ``config`` and ``parseconfig``), each term is hashed
+    to a signed bucket, and term counts are log-scaled and L2-normalized.
+    Needs no model download and no ``sentence_transformers``, encodes
+    thousands of chunks in milliseconds, and gives the same vectors in every
+    process, so it suits air-gapped CI and small sidecars. Ranking quality is
+    lexical: synonyms that share no identifiers do not match.
+
+    Parameters
+    ----------
+    dim : int, default=512
+        Embedding size; more buckets mean fewer hash collisions.
+
+    Example
+    -------
+    >>> opt = SemanticOptimizer(encoder=HashingEncoder())
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _weight(self, term: str) -> float:
+        return 1.0
+
+    def _terms(self, text: str) -> Counter:
+        return Counter(t for t in identifier_tokens(text) if t not in _STOPWORDS)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            for term, count in self._terms(text).items():
+                h = _term_hash(term)
+                rows.append(row)
+                cols.append(h % self.dim)
+                # High bit picks the sign, so collisions tend to cancel out
+                values.append((1.0 + math.log(count)) * self._weight(term) * (-1.0 if h >> 31 else 1.0))
+
+        flat = np.asarray(rows, dtype=np.int64) * self.dim + np.asarray(cols, dtype=np.int64)
+        vectors = np.bincount(flat, weights=values, minlength=len(texts) * self.dim)
+        vectors = vectors.astype(np.float32).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def warmup(self) -> None:
+        pass
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(dim={self.dim})"
+
+
+class TfidfProjectionEncoder(HashingEncoder):
+    """
+    ``HashingEncoder`` with terms weighted by inverse document frequency.
+
+    Call ``fit`` on the corpus (e.g. every chunk of a repository) before
+    indexing, so identifiers common to the whole codebase count for less
+    than distinctive ones. The fitted weights are part of ``name``, which
+    keeps embedding caches and repository indexes from mixing vectors of
+    differently fitted encoders. Unfitted, it weighs every term equally.
+
+    Parameters
+    ----------
+    dim : int, default=512
+        Embedding size.
+    idf : dict, optional
+        Previously fitted ``{term: weight}``, e.g. from ``encoder.idf``.
+
+    Example
+    -------
+    >>> encoder = TfidfProjectionEncoder().fit(chunks)
+    >>> opt = SemanticOptimizer(encoder=encoder, index=".scaledown_index")
+    """
+
+    def __init__(self, dim: int = 512, idf: Optional[Dict[str, float]] = None):
+        super().__init__(dim)
+        self.idf: Dict[str, float] = {}
+        self._default_idf = 1.0
+        self._set_idf(dict(idf or {}))
+
+    def fit(self, texts: Sequence[str]) -> "TfidfProjectionEncoder":
+        """Learn term weights from ``texts``. Returns ``self``."""
+        df: Counter = Counter()
+        for text in texts:
+            df.update(self._terms(text).keys())
+        n = len(texts)
+        self._set_idf({term: math.log((1 + n) / (1 + count)) + 1.0 for term, count in df.items()})
+        return self
+
+    def _set_idf(self, idf: Dict[str, float]) -> None:
+        self.idf = idf
+        if not idf:
+            self._default_idf = 1.0
+            self.name = f"tfidf-{self.dim}"
+            return
+        # Terms never seen in fitting weigh as much as the rarest seen ones
+        self._default_idf = max(idf.values())
+        digest = hashlib.sha256(repr(sorted(idf.items())).encode("utf-8")).hexdigest()[:12]
+        self.name = f"tfidf-{self.dim}-{digest}"
+
+    def _weight(self, term: str) -> float:
+        return self.idf.get(term, self._default_idf)
+
+
+#: Offline encoders that ``SemanticOptimizer(encoder=...)`` accepts by name
+OFFLINE_ENCODERS: Dict[str, Callable[[], BaseEncoder]] = {
+    "hashing": HashingEncoder,
+    "tfidf": TfidfProjectionEncoder,
+}
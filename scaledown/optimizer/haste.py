@@ -2,7 +2,10 @@
 HASTE optimizer integration for scaledown.
 Uses the local HasteContext library for code context retrieval.
 """
-from typing import Union, List, Optional, Dict, Any
+from typing import Union, List, Optional, Dict, Any, Tuple
+from collections import OrderedDict
+import hashlib
+import threading
 import time
 import os
 import tempfile
@@ -13,11 +16,48 @@ try:
 except ImportError:
     HASTE_AVAILABLE = False
 
+try:
+    # The stages behind select_from_file, so per-file preprocessing can be cached.
+    # The haste.api helpers are private: keep the <0.3 pin in pyproject.toml and
+    # test_parse_and_result_caches in step when HasteContext is upgraded
+    from haste.api import _build_call_edges, _build_line_starts, _byte_to_line, _to_doc_list
+    from haste.cast_chunker import ByteSpan, cast_split_merge
+    from haste.exporter import stitch_code
+    from haste.index_py import index_python_file
+    from haste.retriever import bfs_expand, build_bm25_corpus, lexical_topk, normalize_query, semantic_rerank
+    HASTE_STAGES_AVAILABLE = True
+except ImportError:
+    HASTE_STAGES_AVAILABLE = False
+
 from .base import BaseOptimizer
 from ..exceptions import OptimizerError
-from ..types import OptimizedContext, OptimizerMetrics
+from ..types import OptimizedContext, OptimizerMetrics, ContextSource
 from ..types.metrics import count_tokens
 
+# RAM-backed tmpfs, used for scratch copies of in-memory sources where available
+_SHM_DIR = "/dev/shm"
+
+# Preprocessed sources (symbols, BM25 corpus, call graph) kept per optimizer
+PARSE_CACHE_SIZE = 64
+
+# Selections kept per optimizer, keyed by source, query and settings
+RESULT_CACHE_SIZE = 1024
+
+
+def _scratch_dir() -> Optional[str]:
+    """Directory for scratch source files: tmpfs when writable, else the default temp dir."""
+    if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK):
+        return _SHM_DIR
+    return None
+
+
+def _write_scratch_file(data) -> str:
+    """Write ``data`` (bytes or a buffer) to a new ``.py`` scratch file and return its path. The caller deletes it."""
+    fd, path = tempfile.mkstemp(suffix=".py", prefix="scaledown-", dir=_scratch_dir())
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
 
 class HasteOptimizer(BaseOptimizer):
     """
@@ -44,7 +84,14 @@ class HasteOptimizer(BaseOptimizer):
         Hard token cap for output
     soft_cap : int, default=1800
         Soft token cap for output
+
+    Sources are identified by content hash. The symbol table, BM25 corpus
+    and call graph of the last ``PARSE_CACHE_SIZE`` sources are kept, so
+    new queries against a known file skip parsing, and the last
+    ``RESULT_CACHE_SIZE`` selections are kept, so a repeated query (up to
+    case and punctuation, in lexical mode) returns without running HASTE.
     """
+    supports_context_sources = True
     
     def __init__(
         self,
@@ -74,6 +121,9 @@ class HasteOptimizer(BaseOptimizer):
         self.sem_model = sem_model
         self.hard_cap = hard_cap
         self.soft_cap = soft_cap
+        self._parse_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._result_cache: "OrderedDict[Tuple, Tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def optimize(
         self,
@@ -88,8 +138,9 @@ class HasteOptimizer(BaseOptimizer):
         
         Parameters
         ----------
-        context : str or List[str]
-            Source code content (currently expects file path in file_path param)
+        context : str, List[str] or ContextSource
+            Source code content. A ``ContextSource`` backed by a file is
+            analyzed in place through its path.
         query : str
             Query to guide context retrieval (e.g., "find training loop")
         max_tokens : int, optional
@@ -115,57 +166,51 @@ class HasteOptimizer(BaseOptimizer):
         if not query:
             raise ValueError("Query is required for HASTE optimization")
 
-        # 3. Handle string input without file_path by creating a temp file
-        temp_path = None
-        if not file_path:
-            # If context is a string, we can try to write it to a temp file
+        # Code is either a file analyzed in place or in-memory bytes, which
+        # HASTE only sees through a scratch copy, made on a cache miss only
+        data = None
+        if not file_path and isinstance(context, ContextSource) and context.path:
+            # File-backed sources are analyzed in place, without a copy
+            file_path = context.path
+        elif not file_path and isinstance(context, ContextSource):
+            data = bytes(context.buffer())
+        elif not file_path:
             if isinstance(context, str) and len(context.strip()) > 0:
-                # Write to temp file
-                with tempfile.NamedTemporaryFile(
-                    mode='w',
-                    suffix='.py',
-                    delete=False,
-                    encoding='utf-8'
-                ) as f:
-                    f.write(context)
-                    temp_path = f.name
-                file_path = temp_path
+                data = context.encode("utf-8")
             else:
                  raise ValueError(
                     "file_path is required for HASTE optimization, or context must be a valid code string."
                 )
-
+        in_memory = data is not None
 
         try:
-            # Call HASTE's select_from_file function
-            result = select_from_file(
-                path=file_path,
-                query=query,
-                top_k=self.top_k,
-                prefilter=self.prefilter,
-                bfs_depth=self.bfs_depth,
-                max_add=self.max_add,
-                semantic=self.semantic,
-                sem_model=self.sem_model,
-                hard_cap=max_tokens or self.hard_cap,
-                soft_cap=self.soft_cap,
+            if data is None:
+                with open(file_path, "rb") as f:
+                    data = f.read()
+            source_key = (None if in_memory else os.path.abspath(file_path), hashlib.sha256(data).hexdigest())
+            hard_cap = max_tokens or self.hard_cap
+            result_key = (
+                source_key, self._query_key(query), self.top_k, self.prefilter, self.bfs_depth,
+                self.max_add, self.semantic, self.sem_model, hard_cap, self.soft_cap,
             )
-            
+
+            cached = self._cache_get(self._result_cache, result_key)
+            cache_hit = cached is not None
+            if not cache_hit:
+                path = None if in_memory else file_path
+                result, source_tokens = self._select(path, data, source_key, query, hard_cap)
+                optimized_content = result.get('code', '')
+                cached = (
+                    optimized_content,
+                    result.get('nodes', []),
+                    count_tokens(optimized_content, model=self.target_model),
+                    source_tokens,
+                )
+                self._cache_put(self._result_cache, result_key, cached, RESULT_CACHE_SIZE)
+            optimized_content, nodes, optimized_tokens, original_tokens = cached
+
             latency_ms = int((time.time() - start_time) * 1000)
-            
-            # Extract optimized code
-            optimized_content = result.get('code', '')
-            nodes = result.get('nodes', [])
-            
-            # Estimate original tokens
-            original_tokens = 0
-            if file_path and os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    original_code = f.read()
-                original_tokens = count_tokens(original_code, model=self.target_model)
-            
-            optimized_tokens = count_tokens(optimized_content, model=self.target_model)
-            
+
             metrics = OptimizerMetrics(
                 original_tokens=original_tokens,
                 optimized_tokens=optimized_tokens,
@@ -173,7 +218,8 @@ class HasteOptimizer(BaseOptimizer):
                 compression_ratio=original_tokens / max(optimized_tokens, 1),
                 latency_ms=latency_ms,
                 retrieval_mode='hybrid' if self.semantic else 'bm25',
-                ast_fidelity=1.0 
+                ast_fidelity=1.0,
+                details={"result_cache_hit": cache_hit},
             )
             
             return OptimizedContext(
@@ -183,9 +229,116 @@ class HasteOptimizer(BaseOptimizer):
             
         except Exception as e:
             raise OptimizerError(f"HASTE optimization failed: {str(e)}")
+
+    def _query_key(self, query: str) -> Any:
+        """Cache key of `query`: its HASTE search terms in lexical mode, else the query itself."""
+        if HASTE_STAGES_AVAILABLE and not self.semantic:
+            return tuple(normalize_query(query))
+        return query.strip()
+
+    def _cache_get(self, cache: OrderedDict, key: Tuple) -> Any:
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, cache: OrderedDict, key: Tuple, value: Any, size: int) -> None:
+        with self._cache_lock:
+            cache[key] = value
+            if len(cache) > size:
+                cache.popitem(last=False)
+
+    def _parse(self, path: Optional[str], data: bytes, source_key: Tuple) -> Dict[str, Any]:
+        """Symbols, BM25 corpus and call graph of a source, reused across queries."""
+        parsed = self._cache_get(self._parse_cache, source_key)
+        if parsed is not None:
+            return parsed
+
+        scratch = None
+        if path is None:
+            scratch = path = _write_scratch_file(data)
+        try:
+            src_bytes, symbols, _aliases = index_python_file(path)
         finally:
-            if temp_path and os.path.exists(temp_path):
-                os.unlink(temp_path)
+            if scratch:
+                os.unlink(scratch)
+        docs = _to_doc_list(symbols)
+        docs_by_name: Dict[str, List[Any]] = {}
+        for doc in docs:
+            docs_by_name.setdefault(doc.name, []).append(doc)
+        parsed = {
+            "src_bytes": src_bytes,
+            "docs": docs,
+            "bm25": build_bm25_corpus(docs)[0],
+            "call_edges": _build_call_edges(symbols),
+            "docs_by_name": docs_by_name,
+            "line_starts": _build_line_starts(src_bytes),
+            "tokens": count_tokens(data.decode("utf-8", errors="replace"), model=self.target_model),
+        }
+        self._cache_put(self._parse_cache, source_key, parsed, PARSE_CACHE_SIZE)
+        return parsed
+
+    def _select(self, path: Optional[str], data: bytes, source_key: Tuple, query: str, hard_cap: int):
+        """
+        Run HASTE selection, as `select_from_file` does, on the cached preprocessing
+        of the source. Returns the selection (``code`` and ``nodes``) and the
+        source's token count.
+        """
+        if not HASTE_STAGES_AVAILABLE:
+            scratch = None
+            if path is None:
+                scratch = path = _write_scratch_file(data)
+            try:
+                result = select_from_file(
+                    path=path, query=query, top_k=self.top_k, prefilter=self.prefilter,
+                    bfs_depth=self.bfs_depth, max_add=self.max_add, semantic=self.semantic,
+                    sem_model=self.sem_model, hard_cap=hard_cap, soft_cap=self.soft_cap,
+                )
+            finally:
+                if scratch:
+                    os.unlink(scratch)
+            return result, count_tokens(data.decode("utf-8", errors="replace"), model=self.target_model)
+
+        soft_cap = self.soft_cap
+        if hard_cap <= 0 or soft_cap <= 0:
+            raise ValueError("hard_cap and soft_cap must be positive integers")
+        soft_cap = max(soft_cap, hard_cap)
+
+        parsed = self._parse(path, data, source_key)
+        src_bytes, docs, bm25 = parsed["src_bytes"], parsed["docs"], parsed["bm25"]
+        prelim = lexical_topk(docs, bm25, query, k=self.top_k, prefilter=self.prefilter)
+        if self.semantic:
+            prelim = semantic_rerank(prelim, query, self.sem_model, src_bytes=src_bytes)
+        if not prelim:
+            prelim = lexical_topk(docs, bm25, query, k=self.top_k, prefilter=max(30, self.top_k))
+        expanded = bfs_expand(
+            prelim[:self.top_k], parsed["docs_by_name"], parsed["call_edges"],
+            depth=self.bfs_depth, max_add=self.max_add,
+        )
+
+        spans = [ByteSpan(d.start_byte, d.end_byte) for d in expanded]
+        stitched = cast_split_merge(src_bytes, spans, hard_cap_tokens=hard_cap, soft_cap_tokens=soft_cap)
+        code, _mapping = stitch_code(src_bytes, stitched)
+
+        line_starts = parsed["line_starts"]
+        nodes = [
+            {
+                "type": d.kind,
+                "name": d.name,
+                "qname": d.qname,
+                "module": d.module,
+                "path": d.path,
+                "lineno": _byte_to_line(d.start_byte, line_starts),
+                "end_lineno": _byte_to_line(max(d.end_byte - 1, 0), line_starts),
+                "signature": d.signature,
+                "docstring": d.docstring or None,
+                "score": d.score,
+            }
+            for d in expanded
+        ]
+        return {"code": code, "nodes": nodes}, parsed["tokens"]
+
 # Alias for backward compatibility
 HasteContext = HasteOptimizer
     
\ No newline at end of file
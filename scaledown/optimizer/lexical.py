@@ -0,0 +1,100 @@
+"""
+Lexical retrieval over code chunks.
+"""
+import re
+from collections import Counter
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_WORD_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def identifier_tokens(text: str) -> List[str]:
+    """
+    Lower-cased terms of ``text``, with identifiers split at underscores and camelCase.
+
+    ``parseHTTPResponse`` yields ``parse``, ``http``, ``response`` and the joined
+    ``parsehttpresponse``, so parts match and ``parse_http_response`` matches
+    the whole name too.
+    """
+    tokens = []
+    for word in _IDENTIFIER.findall(text):
+        parts = [p.lower() for piece in word.split("_") for p in _WORD_PART.findall(piece)]
+        tokens.extend(parts)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of documents, scored with NumPy.
+
+    Postings are stored as flat arrays sorted by term, with each posting's
+    BM25 weight precomputed, so scoring a query is a slice per query term and
+    one ``bincount``.
+
+    Parameters
+    ----------
+    documents : Sequence[str]
+        Texts to index; tokenized with ``identifier_tokens``.
+    k1, b : float
+        Standard BM25 term-frequency saturation and length normalization.
+    """
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.vocabulary: Dict[str, int] = {}
+        doc_ids, term_ids, counts = [], [], []
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc_id, document in enumerate(documents):
+            tokens = identifier_tokens(document)
+            lengths[doc_id] = len(tokens)
+            for term, count in Counter(tokens).items():
+                doc_ids.append(doc_id)
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                counts.append(count)
+
+        self.n_documents = len(documents)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        tf = np.asarray(counts, dtype=np.float32)
+
+        df = np.bincount(term_ids, minlength=len(self.vocabulary)).astype(np.float32)
+        idf = np.log1p((self.n_documents - df + 0.5) / (df + 0.5))
+        avg_length = max(float(lengths.mean()) if len(lengths) else 0.0, 1.0)
+        norm = k1 * (1 - b + b * lengths[doc_ids] / avg_length)
+        weights = idf[term_ids] * tf * (k1 + 1) / (tf + norm)
+
+        order = np.argsort(term_ids, kind="stable")
+        self._docs = doc_ids[order]
+        self._weights = weights[order].astype(np.float32)
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(self.vocabulary)))])
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for ``query``."""
+        terms = {self.vocabulary[t] for t in identifier_tokens(query) if t in self.vocabulary}
+        if not terms:
+            return np.zeros(self.n_documents, dtype=np.float32)
+        slices = [slice(self._offsets[t], self._offsets[t + 1]) for t in terms]
+        docs = np.concatenate([self._docs[s] for s in slices])
+        weights = np.concatenate([self._weights[s] for s in slices])
+        return np.bincount(docs, weights=weights, minlength=self.n_documents).astype(np.float32)
+
+    def top(self, query: str, k: int) -> np.ndarray:
+        """Indices of up to ``k`` best-scoring documents that match ``query`` at all, best first."""
+        scores = self.scores(query)
+        matching = np.flatnonzero(scores > 0)
+        if len(matching) > k:
+            matching = matching[np.argpartition(-scores[matching], k - 1)[:k]]
+        return matching[np.argsort(-scores[matching], kind="stable")]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> Dict[int, float]:
+    """Fuse several best-first rankings: each item scores ``sum(1 / (k + rank))``."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return fused
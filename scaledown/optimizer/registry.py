@@ -0,0 +1,139 @@
+"""
+Process-wide registry of loaded embedding models.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Short text encoded by warmup() to initialise kernels and caches
+_WARMUP_TEXT = "def warmup():\n    return None"
+
+
+class _Entry:
+    __slots__ = ("model", "last_used")
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.last_used = time.monotonic()
+
+
+class ModelRegistry:
+    """
+    Shares loaded embedding models between optimizer instances.
+
+    Models are keyed by loader and model name, so every ``SemanticOptimizer``
+    using the same ``model_name`` in a process shares one copy. Loading is
+    thread-safe and happens at most once per model, even when many threads
+    ask for it at the same time.
+
+    Parameters
+    ----------
+    idle_timeout : float, optional
+        Unload models not used for this many seconds. None keeps them loaded.
+
+    Example
+    -------
+    >>> from scaledown.optimizer import model_registry
+    >>> model_registry.warmup("Qwen/Qwen3-Embedding-0.6B")   # at service start
+    >>> model_registry.set_idle_timeout(600)                  # free memory after 10 idle minutes
+    """
+
+    def __init__(self, idle_timeout: Optional[float] = None):
+        self._entries: Dict[Tuple[Hashable, str], _Entry] = {}
+        self._load_locks: Dict[Tuple[Hashable, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self.idle_timeout = None
+        self.set_idle_timeout(idle_timeout)
+
+    def get(self, model_name: str, loader: Optional[Callable[[str], Any]] = None) -> Any:
+        """
+        Return the shared model for ``model_name``, loading it on first use.
+
+        ``loader`` builds the model from its name and defaults to
+        ``sentence_transformers.SentenceTransformer``.
+        """
+        if loader is None:
+            from sentence_transformers import SentenceTransformer
+            loader = SentenceTransformer
+        key = (loader, model_name)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                return entry.model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                logger.info(f"Loading embedding model: {model_name}...")
+                entry = _Entry(loader(model_name))
+                with self._lock:
+                    self._entries[key] = entry
+            entry.last_used = time.monotonic()
+            return entry.model
+
+    def warmup(self, model_name: str, loader: Optional[Callable[[str], Any]] = None) -> Any:
+        """Load ``model_name`` and run one encode so the first real request pays no start-up cost."""
+        model = self.get(model_name, loader)
+        model.encode([_WARMUP_TEXT])
+        return model
+
+    def unload(self, model_name: Optional[str] = None) -> int:
+        """Drop ``model_name`` (or every model) from the registry. Returns the number unloaded."""
+        with self._lock:
+            keys = [k for k in self._entries if model_name is None or k[1] == model_name]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def unload_idle(self) -> int:
+        """Drop models unused for longer than ``idle_timeout``."""
+        if self.idle_timeout is None:
+            return 0
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            keys = [k for k, entry in self._entries.items() if entry.last_used < cutoff]
+            for key in keys:
+                logger.info(f"Unloading idle embedding model: {key[1]}")
+                del self._entries[key]
+        return len(keys)
+
+    def set_idle_timeout(self, seconds: Optional[float]) -> None:
+        """Enable (or with None, disable) unloading of idle models."""
+        self.idle_timeout = seconds
+        self._wakeup.set()
+        if seconds is not None and (self._reaper is None or not self._reaper.is_alive()):
+            self._reaper = threading.Thread(target=self._reap, name="scaledown-model-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        while True:
+            timeout = self.idle_timeout
+            if timeout is None:
+                return
+            self._wakeup.clear()
+            self.unload_idle()
+            self._wakeup.wait(max(timeout / 2, 0.01))
+
+    def __contains__(self, model_name: str) -> bool:
+        with self._lock:
+            return any(k[1] == model_name for k in self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"ModelRegistry(models={[k[1] for k in self._entries]}, idle_timeout={self.idle_timeout})"
+
+
+#: Registry shared by every SemanticOptimizer in the process
+model_registry = ModelRegistry()
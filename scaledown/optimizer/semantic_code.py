@@ -1,39 +1,197 @@
 import os
 import ast
+import hashlib
 import logging
+import re
+import threading
 import time
-from typing import List, Dict, Any, Optional, Union
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Union
 from pathlib import Path
 
 from scaledown.optimizer.base import BaseOptimizer
-from scaledown.types import OptimizedContext
-from scaledown.types.metrics import OptimizerMetrics, count_tokens
+from scaledown.types import OptimizedContext, ContextSource
+from scaledown.types.metrics import OptimizerMetrics, count_tokens, count_tokens_batch
 from scaledown.exceptions import OptimizerError
+from scaledown.optimizer.ann_index import INDEX_TYPES, VECTOR_DTYPES, VectorSearch
+from scaledown.optimizer.lexical import BM25Index, reciprocal_rank_fusion
+from scaledown.optimizer.registry import model_registry
 
 logger = logging.getLogger(__name__)
 
+RESULT_SEPARATOR = "\n\n# ... [Semantic Context Search Result] ...\n\n"
+
+# Parsed in-memory contexts kept per optimizer
+PARSE_CACHE_SIZE = 256
+
+# BM25 indexes over recent chunk sets kept per optimizer, for hybrid retrieval
+LEXICAL_CACHE_SIZE = 8
+
+# Candidates are drawn from this many times `top_k` best matches, to backfill overlaps or pack a budget
+CANDIDATE_FACTOR = 4
+
+def _contains(outer: Tuple, inner: Tuple) -> bool:
+    """Whether the (file, first line, last line) span `outer` encloses `inner`."""
+    return outer[0] == inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2]
+
+def _overlaps(a: Tuple, b: Tuple) -> bool:
+    return a[0] == b[0] and a[1] <= b[2] and b[1] <= a[2]
+
+def _span(unit: Dict[str, Any]) -> Tuple:
+    metadata = unit["metadata"]
+    return (metadata["file_name"], metadata["lineno"], metadata["end_lineno"])
+
+_NEWLINE = re.compile(rb"\r\n|\r|\n")
+
+def _line_offsets(data: bytes) -> List[int]:
+    """Byte offset of the start of every line, with a leading 0 so 1-based line numbers index it."""
+    return [0, 0] + [m.end() for m in _NEWLINE.finditer(data)]
+
+def extract_semantic_units(source: str, file_name: str) -> List[Dict[str, Any]]:
+    """
+    Split Python source into a whole-file unit followed by one unit per class and function.
+
+    Runs in a single pass: line offsets are computed once and each node is
+    sliced out of the UTF-8 source by byte offset. Decorators are included
+    in their definition's code. Each unit's metadata carries the file name
+    and the 1-based line span of the definition.
+    """
+    tree = ast.parse(source)
+    data = source.encode("utf-8")
+    offsets = _line_offsets(data)
+    units = []
+
+    # Add the full file context
+    units.append({
+        "type": "file",
+        "name": file_name,
+        "code": source,
+        "metadata": {"file_name": file_name}
+    })
+
+    # Walk AST for Classes and Functions
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            unit_type = "class"
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            unit_type = "function"
+        else:
+            continue
+
+        lineno = node.lineno
+        start = offsets[lineno] + node.col_offset
+        if node.decorator_list:
+            first = node.decorator_list[0]
+            lineno = first.lineno
+            # Decorator positions point past the "@"
+            start = data.rfind(b"@", offsets[lineno], offsets[lineno] + first.col_offset)
+        end = offsets[node.end_lineno] + node.end_col_offset
+
+        units.append({
+            "type": unit_type,
+            "name": node.name,
+            "code": data[start:end].decode("utf-8"),
+            "metadata": {"file_name": file_name, "lineno": lineno, "end_lineno": node.end_lineno}
+        })
+    return units
+
 class SemanticOptimizer(BaseOptimizer):
     """
     An optimizer that uses local embeddings and FAISS to find semantically 
     relevant code chunks (functions/classes) for a given query.
+
+    Pass `embedding_cache` (a directory or an `EmbeddingCache`) to persist
+    chunk embeddings, so unchanged chunks are not re-embedded on later calls.
+
+    Pass `index` (a directory or a `RepositoryIndex`) and call
+    `index_repository(root)` to search a whole source tree; `optimize` then
+    queries the index whenever no `file_path` is given.
+
+    Instances with the same `model_name` share one loaded model through
+    `model_registry`; call `warmup()` to load it ahead of the first request.
+    Pass `encoder` (a `BaseEncoder`, e.g. `MultiProcessEncoder`) to embed
+    with a different backend; its `name` then replaces `model_name`.
+    `encoder="hashing"` or `encoder="tfidf"` selects a NumPy-only offline
+    encoder that needs no model download.
+
+    Query embeddings are cached in `query_embedding_cache`, shared by all
+    instances in the process and keyed by model name, so repeated queries
+    skip the model. Pass your own `QueryEmbeddingCache` as `query_cache` to
+    size it separately, or `query_cache=False` to disable it.
+
+    `retrieval="hybrid"` shortlists up to `hybrid_shortlist` chunks per query
+    with BM25 over identifier-split tokens, embeds only those, and fuses both
+    rankings with reciprocal-rank fusion.
+
+    `index_type` picks the FAISS index: "flat" (exact, the default), "ivf",
+    "hnsw" or "ivfpq" (compressed). `index_params` tunes it, e.g.
+    `{"nlist": 4096, "nprobe": 16}` or `{"ef_search": 128}`; see `build_index`.
+
+    `vector_dtype` ("float32", "float16" or "int8") and `truncate_dim` shrink
+    the vectors held by the index; the top `rescore_factor * top_k`
+    candidates are then re-ranked against full-precision vectors.
     """
+    supports_context_sources = True
 
-    def __init__(self, model_name: str = "Qwen/Qwen3-Embedding-0.6B", top_k: int = 3, target_model: str = "gpt-4o", **kwargs):
+    def __init__(self, model_name: str = "Qwen/Qwen3-Embedding-0.6B", top_k: int = 3, target_model: str = "gpt-4o",
+                 embedding_cache=None, index=None, index_type: str = "flat",
+                 index_params: Optional[Dict[str, Any]] = None, vector_dtype: str = "float32",
+                 truncate_dim: Optional[int] = None, rescore_factor: int = 4, encoder=None,
+                 retrieval: str = "dense", hybrid_shortlist: int = 50, query_cache=True, **kwargs):
         super().__init__(target_model=target_model, **kwargs)
+        if retrieval not in ("dense", "hybrid"):
+            raise ValueError(f"retrieval must be 'dense' or 'hybrid', got {retrieval!r}")
+        self.retrieval = retrieval
+        self.hybrid_shortlist = hybrid_shortlist
+        if isinstance(encoder, str):
+            from .encoders import OFFLINE_ENCODERS
+            if encoder not in OFFLINE_ENCODERS:
+                raise ValueError(f"encoder must be a BaseEncoder or one of {tuple(OFFLINE_ENCODERS)}, got {encoder!r}")
+            encoder = OFFLINE_ENCODERS[encoder]()
+        self.encoder = encoder
         self.model_name = model_name
         self.top_k = top_k
-        self._model = None
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {index_type!r}")
+        self.index_type = index_type
+        self.index_params = dict(index_params or {})
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"vector_dtype must be one of {VECTOR_DTYPES}, got {vector_dtype!r}")
+        self.vector_dtype = vector_dtype
+        self.truncate_dim = truncate_dim
+        self.rescore_factor = rescore_factor
+        if isinstance(embedding_cache, str):
+            from .embedding_cache import EmbeddingCache
+            embedding_cache = EmbeddingCache(embedding_cache)
+        self.embedding_cache = embedding_cache
+        if query_cache is True:
+            from .embedding_cache import query_embedding_cache
+            query_cache = query_embedding_cache
+        # An empty cache is falsy, so only False disables it
+        self.query_cache = None if query_cache is False else query_cache
+        if isinstance(index, str):
+            from .semantic_index import RepositoryIndex
+            index = RepositoryIndex(
+                index, index_type=index_type, index_params=index_params, vector_dtype=vector_dtype,
+                truncate_dim=truncate_dim, rescore_factor=rescore_factor,
+            )
+        self.index = index
+        self._parse_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._parse_lock = threading.Lock()
+        self._lexical_cache: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._loader = None
         self._faiss = None
         self._numpy = None
         self.model_load_failed = False
 
     def _lazy_load_deps(self):
         """Lazily import heavy ML dependencies."""
-        if self._model is not None or self.model_load_failed:
+        if self._faiss is not None or self.model_load_failed:
             return
 
         try:
-            from sentence_transformers import SentenceTransformer
+            if self.encoder is None:
+                from sentence_transformers import SentenceTransformer
             import faiss
             import numpy as np
         except ImportError as e:
@@ -42,9 +200,10 @@ class SemanticOptimizer(BaseOptimizer):
                 "Install them with: pip install scaledown[semantic]"
             ) from e
 
-        logger.info(f"Loading embedding model: {self.model_name}...")
         try:
-            self._model = SentenceTransformer(self.model_name)
+            if self.encoder is None:
+                model_registry.get(self.model_name, SentenceTransformer)
+                self._loader = SentenceTransformer
             self._faiss = faiss
             self._numpy = np
         except Exception as e:
@@ -53,40 +212,65 @@ class SemanticOptimizer(BaseOptimizer):
             logger.warning("Falling back to pass-through mode.")
             self.model_load_failed = True
 
+    @property
+    def model_name(self) -> str:
+        """Name of the embedding space: the encoder's `name` when one is set."""
+        return self.encoder.name if self.encoder is not None else self._model_name
+
+    @model_name.setter
+    def model_name(self, value: str) -> None:
+        self._model_name = value
+
+    @property
+    def _model(self):
+        """The encoder, or the shared model, reloaded if the registry unloaded it while idle."""
+        if self.encoder is not None:
+            return self.encoder
+        return model_registry.get(self.model_name, self._loader)
+
+    def warmup(self) -> "SemanticOptimizer":
+        """Load the embedding model and run one encode, e.g. at service start."""
+        self._lazy_load_deps()
+        if self.encoder is not None:
+            self.encoder.warmup()
+        elif not self.model_load_failed:
+            model_registry.warmup(self.model_name, self._loader)
+        return self
+
+    def _units_from_documents(self, documents: List[str]) -> List[Dict[str, Any]]:
+        """
+        Chunk in-memory Python source, one document per string.
+
+        Parsed units are cached by content hash, so repeated contexts are not
+        re-parsed. Documents that are not valid Python contribute no units.
+        """
+        units = []
+        for i, document in enumerate(documents):
+            key = hashlib.sha256(document.encode("utf-8")).hexdigest()
+            with self._parse_lock:
+                parsed = self._parse_cache.get(key)
+                if parsed is not None:
+                    self._parse_cache.move_to_end(key)
+            if parsed is None:
+                try:
+                    parsed = extract_semantic_units(document, "<context>")[1:]
+                except (SyntaxError, ValueError):
+                    parsed = []
+                with self._parse_lock:
+                    self._parse_cache[key] = parsed
+                    if len(self._parse_cache) > PARSE_CACHE_SIZE:
+                        self._parse_cache.popitem(last=False)
+
+            name = "<context>" if len(documents) == 1 else f"<context {i}>"
+            units.extend({**u, "metadata": {**u["metadata"], "file_name": name}} for u in parsed)
+        return units
+
     def _extract_semantic_units(self, file_path: str) -> List[Dict[str, Any]]:
         """Extracts functions and classes using AST."""
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 source = f.read()
-            
-            tree = ast.parse(source)
-            units = []
-
-            # Add the full file context
-            units.append({
-                "type": "file",
-                "name": os.path.basename(file_path),
-                "code": source,
-                "metadata": {"file_name": os.path.basename(file_path)}
-            })
-
-            # Walk AST for Classes and Functions
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    units.append({
-                        "type": "class",
-                        "name": node.name,
-                        "code": ast.get_source_segment(source, node),
-                        "metadata": {"file_name": os.path.basename(file_path)}
-                    })
-                elif isinstance(node, ast.FunctionDef):
-                    units.append({
-                        "type": "function",
-                        "name": node.name,
-                        "code": ast.get_source_segment(source, node),
-                        "metadata": {"file_name": os.path.basename(file_path)}
-                    })
-            return units
+            return extract_semantic_units(source, os.path.basename(file_path))
         except Exception as e:
             raise OptimizerError(f"Failed to parse AST for {file_path}: {e}")
 
@@ -100,80 +284,371 @@ class SemanticOptimizer(BaseOptimizer):
     ) -> OptimizedContext:
         """
         Embeds the code in `file_path` and returns the segments most relevant to `query`.
+
+        Without `file_path`, `context` itself is chunked: a string of Python
+        source, or a list of them as separate documents.
         """
+        return self._optimize_queries(context, [query], file_path, max_tokens)[0]
+
+    def optimize_many(
+        self,
+        queries: List[Optional[str]],
+        file_path: Optional[str] = None,
+        context: Union[str, List[str]] = "",
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> List[OptimizedContext]:
+        """
+        Answers several queries against the same code, returning one result per query.
+
+        The file is parsed, embedded and indexed once, all queries are encoded
+        in a single batch, and the index is searched once for the whole batch.
+        """
+        return self._optimize_queries(context, list(queries), file_path, max_tokens)
+
+    def _optimize_queries(
+        self, context, queries: List[Optional[str]], file_path, max_tokens=None
+    ) -> List[OptimizedContext]:
         start_time = time.time()
+        if not queries:
+            return []
+
+        if self.index is not None and not file_path:
+            return self._optimize_repository(context, queries, start_time, max_tokens)
+
+        if not file_path and isinstance(context, ContextSource) and context.path:
+            file_path = context.path
+        elif isinstance(context, ContextSource):
+            context = context.text()
 
         if not file_path:
-            logger.warning("SemanticOptimizer requires 'file_path'. Returning original.")
-            orig_tokens = count_tokens(str(context), model=self.target_model)
-            return self._create_fallback_context(str(context), orig_tokens, start_time, "missing_filepath")
+            # In-memory context: one document, or several as a list
+            documents = [str(d) for d in context] if isinstance(context, list) else [str(context)]
+            full_source = "\n\n".join(documents)
+            orig_tokens = count_tokens(full_source, model=self.target_model)
 
-        self._lazy_load_deps()
-        
-        # Extract Chunks
-        units = self._extract_semantic_units(file_path)
-        full_source = units[0]["code"] if units and units[0]["type"] == "file" else ""
-        orig_tokens = count_tokens(full_source, model=self.target_model)
+            # Parse before loading the model, so non-code context is returned untouched cheaply
+            units = self._units_from_documents(documents)
+            if not units:
+                return self._fallbacks(queries, full_source, orig_tokens, start_time, "unparseable_context")
+            self._lazy_load_deps()
+        else:
+            self._lazy_load_deps()
+
+            # Extract Chunks
+            units = self._extract_semantic_units(file_path)
+            full_source = units[0]["code"] if units and units[0]["type"] == "file" else ""
+            orig_tokens = count_tokens(full_source, model=self.target_model)
 
         # whether model fails to load
         if self.model_load_failed:
-            return self._create_fallback_context(full_source, orig_tokens, start_time, "model_load_failed")
+            return self._fallbacks(queries, full_source, orig_tokens, start_time, "model_load_failed")
         
         if not units:
-             return self._create_fallback_context("", orig_tokens, start_time, "no_units")
+             return self._fallbacks(queries, "", orig_tokens, start_time, "no_units")
 
         # Embed Chunks
         valid_units = [u for u in units if u.get("code") and u.get("type") != "file"]
         
         if not valid_units:
-             return self._create_fallback_context("", orig_tokens, start_time, "no_valid_chunks")
+             return self._fallbacks(queries, "", orig_tokens, start_time, "no_valid_chunks")
 
         codes = [u["code"] for u in valid_units]
-        embeddings = self._model.encode(codes)
+        if self.retrieval == "hybrid":
+            rankings, details = self._hybrid_rank(codes, queries)
+            retrieval_mode = "semantic_hybrid"
+        else:
+            rankings, details = self._dense_rank(codes, queries)
+            retrieval_mode = "semantic_search"
 
-        # Build Index
-        d = embeddings.shape[1]
-        index = self._faiss.IndexFlatL2(d)
-        index.add(self._numpy.array(embeddings, dtype=self._numpy.float32))
+        # Token counts for budgeted packing, shared by all queries
+        chunk_tokens = count_tokens_batch(codes, model=self.target_model) if max_tokens is not None else None
+        details["batch_size"] = len(queries)
 
-        # Embed Query & Search
-        if not query:
-             query = "main logic"
+        # Construct Results
+        optimized = []
+        for ranking in rankings:
+            candidates = [
+                {"code": valid_units[idx]["code"], "score": score, "distance": dist,
+                 "tokens": chunk_tokens[idx] if chunk_tokens else None,
+                 "span": _span(valid_units[idx])}
+                for idx, score, dist in ranking
+            ]
+            selected, removed = self._select(candidates, max_tokens)
+            optimized.append(self._build_result(
+                selected, orig_tokens, retrieval_mode, {**details, **removed}, start_time, max_tokens
+            ))
+        return optimized
 
-        query_emb = self._model.encode([query])
-        k_search = min(self.top_k, len(valid_units))
-        
-        distances, indices = index.search(
-            self._numpy.array(query_emb, dtype=self._numpy.float32), 
-            k=k_search
+    def _dense_rank(self, codes: List[str], queries: List[Optional[str]]):
+        """Embed every chunk and rank by vector distance. Yields (chunk, score, distance) per query."""
+        embeddings, cache_details = self._embed_chunks(codes)
+
+        # Build Index
+        index = VectorSearch(
+            embeddings, self.index_type, self.index_params, self.vector_dtype, self.truncate_dim, self.rescore_factor
         )
 
-        # Construct Result
-        results = []
-        for idx in indices[0]:
-            if idx != -1:
-                results.append(valid_units[idx]["code"])
+        # Embed Queries & Search in one batch
+        query_emb, query_details = self._encode_queries(queries)
+        k_search = min(self._candidate_count(), len(codes))
+        distances, indices = index.search(query_emb, k=k_search)
+
+        rankings = [
+            [(int(idx), 1.0 / (1.0 + float(dist)), float(dist)) for dist, idx in zip(row_distances, row) if idx != -1]
+            for row_distances, row in zip(distances, indices)
+        ]
+        return rankings, {**cache_details, **query_details, **index.details()}
+
+    def _hybrid_rank(self, codes: List[str], queries: List[Optional[str]]):
+        """
+        BM25 shortlists chunks per query; only shortlisted chunks are embedded,
+        and lexical and vector rankings are fused with reciprocal-rank fusion.
+        A query with no lexical match is ranked over every chunk.
+        """
+        np = self._numpy
+        queries = [q or "main logic" for q in queries]
+        bm25 = self._bm25_index(codes)
+        shortlist_size = max(self.hybrid_shortlist, self._candidate_count())
+        lexical = [bm25.top(q, shortlist_size).tolist() for q in queries]
+        shortlists = [ranking or list(range(len(codes))) for ranking in lexical]
+
+        # Embed the union of all shortlists once
+        embedded = sorted(set().union(*shortlists))
+        embeddings, cache_details = self._embed_chunks([codes[i] for i in embedded])
+        row_of = {chunk: row for row, chunk in enumerate(embedded)}
+        query_emb, query_details = self._encode_queries(queries)
+
+        rankings = []
+        for query_vector, lexical_ranking, shortlist in zip(query_emb, lexical, shortlists):
+            distances = ((embeddings[[row_of[i] for i in shortlist]] - query_vector) ** 2).sum(axis=1)
+            distance_of = dict(zip(shortlist, distances.tolist()))
+            dense_ranking = [shortlist[j] for j in np.argsort(distances, kind="stable")]
+            fused = reciprocal_rank_fusion([lexical_ranking, dense_ranking])
+            best = sorted(fused, key=fused.get, reverse=True)[:self._candidate_count()]
+            rankings.append([(i, fused[i], distance_of[i]) for i in best])
+
+        return rankings, {
+            **cache_details,
+            **query_details,
+            "chunks_embedded": len(embedded),
+            "chunks_total": len(codes),
+            "lexical_misses": sum(1 for ranking in lexical if not ranking),
+        }
+
+    def _bm25_index(self, codes: List[str]) -> BM25Index:
+        """BM25 index over `codes`, reused while the same chunks are searched again."""
+        digest = hashlib.sha256()
+        for code in codes:
+            digest.update(code.encode("utf-8"))
+            digest.update(b"\0")
+        key = digest.hexdigest()
+        with self._parse_lock:
+            bm25 = self._lexical_cache.get(key)
+            if bm25 is not None:
+                self._lexical_cache.move_to_end(key)
+                return bm25
+        bm25 = BM25Index(codes)
+        with self._parse_lock:
+            self._lexical_cache[key] = bm25
+            if len(self._lexical_cache) > LEXICAL_CACHE_SIZE:
+                self._lexical_cache.popitem(last=False)
+        return bm25
+
+    def _candidate_count(self) -> int:
+        """Matches to retrieve: enough beyond `top_k` to backfill overlaps or pack a token budget."""
+        return self.top_k * CANDIDATE_FACTOR
+
+    def _select(self, candidates: List[Dict[str, Any]], max_tokens: Optional[int]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Pick the chunks to return from `candidates`, which are ordered best first.
+
+        Without a budget this is the `top_k` best. With `max_tokens`, chunks are
+        packed greedily by score per token until the budget is spent.
+        Chunks nested in an already chosen one are dropped, and a chunk that
+        encloses chosen ones replaces them, so no code is returned twice; the
+        freed room goes to the next-best chunk. Results are in source order.
+        """
+        def tokens(c):
+            if c["tokens"] is None:
+                c["tokens"] = count_tokens(c["code"], model=self.target_model)
+            return c["tokens"]
+
+        if max_tokens is None:
+            order = list(range(len(candidates)))
+        else:
+            if any(c["tokens"] is None for c in candidates):
+                counts = count_tokens_batch([c["code"] for c in candidates], model=self.target_model)
+                for candidate, count in zip(candidates, counts):
+                    candidate["tokens"] = count
+            order = sorted(
+                range(len(candidates)),
+                key=lambda i: candidates[i]["score"] / max(candidates[i]["tokens"], 1),
+                reverse=True,
+            )
+        separator_tokens = count_tokens(RESULT_SEPARATOR, model=self.target_model) if max_tokens is not None else 0
+
+        chosen: List[int] = []
+        used = 0
+        removed = {"overlapping_chunks_removed": 0, "duplicate_tokens_removed": 0}
+        for i in order:
+            if max_tokens is None and len(chosen) >= self.top_k:
+                break
+            span = candidates[i]["span"]
+            if any(_overlaps(candidates[j]["span"], span) and not _contains(span, candidates[j]["span"]) for j in chosen):
+                # Already covered by a chosen chunk
+                removed["overlapping_chunks_removed"] += 1
+                removed["duplicate_tokens_removed"] += tokens(candidates[i])
+                continue
+
+            nested = [j for j in chosen if _contains(span, candidates[j]["span"])]
+            if max_tokens is not None:
+                cost = tokens(candidates[i]) - sum(candidates[j]["tokens"] for j in nested)
+                cost += separator_tokens * (1 - len(nested)) if chosen else 0
+                if used + cost > max_tokens:
+                    continue
+                used += cost
+
+            for j in nested:
+                removed["overlapping_chunks_removed"] += 1
+                removed["duplicate_tokens_removed"] += tokens(candidates[j])
+            chosen = [j for j in chosen if j not in nested] + [i]
+
+        def assemble(indices):
+            return sorted((candidates[j] for j in indices), key=lambda c: c["span"])
+
+        if max_tokens is None:
+            return assemble(chosen), removed
+
+        # Joining can merge tokens across chunk boundaries; drop the last packed chunk if that overshoots
+        while chosen:
+            selected = assemble(chosen)
+            content = RESULT_SEPARATOR.join(c["code"] for c in selected)
+            if count_tokens(content, model=self.target_model) <= max_tokens:
+                return selected, removed
+            chosen.pop()
+        return [], removed
+
+    def _build_result(
+        self, selected: List[Dict[str, Any]], orig_tokens: int, retrieval_mode: str,
+        details: Dict[str, Any], start_time: float, max_tokens: Optional[int]
+    ) -> OptimizedContext:
+        final_content = RESULT_SEPARATOR.join(c["code"] for c in selected)
 
-        final_content = "\n\n# ... [Semantic Context Search Result] ...\n\n".join(results)
-        
         # Metrics Calculation
         opt_tokens = count_tokens(final_content, model=self.target_model)
-        latency = (time.time() - start_time) * 1000
         ratio = opt_tokens / orig_tokens if orig_tokens > 0 else 0.0
+        if max_tokens is not None:
+            details = {**details, "max_tokens": max_tokens}
 
         return OptimizedContext(
             content=final_content,
             metrics=OptimizerMetrics(
                 original_tokens=orig_tokens,
                 optimized_tokens=opt_tokens,
-                chunks_retrieved=len(results),     
-                compression_ratio=ratio,           
-                latency_ms=latency,                
-                retrieval_mode="semantic_search",  
-                ast_fidelity=1.0
+                chunks_retrieved=len(selected),
+                compression_ratio=ratio,
+                latency_ms=(time.time() - start_time) * 1000,
+                retrieval_mode=retrieval_mode,
+                ast_fidelity=1.0,
+                details=details
             )
         )
 
+    def _encode_queries(self, queries: List[Optional[str]]):
+        """Encode all queries in a single model call, skipping those in the query cache."""
+        np = self._numpy
+        queries = [q or "main logic" for q in queries]
+        if self.query_cache is None:
+            return np.asarray(self._model.encode(queries), dtype=np.float32), {}
+
+        embeddings, stats = self.query_cache.encode(self.model_name, queries, self._model.encode)
+        return embeddings, {"query_cache_hits": stats["hits"], "query_cache_misses": stats["misses"]}
+
+    def index_repository(self, root: str, max_workers: Optional[int] = None, batch_size: int = 256) -> Dict[str, int]:
+        """
+        Ingest or incrementally refresh the source tree under `root` into `self.index`.
+
+        Returns the number of files added, updated, removed and unchanged.
+        """
+        if self.index is None:
+            raise OptimizerError("index_repository requires SemanticOptimizer(index=...)")
+        self._lazy_load_deps()
+        if self.model_load_failed:
+            raise OptimizerError(f"Cannot index {root}: embedding model '{self.model_name}' failed to load")
+
+        return self.index.update(
+            root,
+            encode=lambda codes: self._embed_chunks(codes)[0],
+            model_name=self.model_name,
+            target_model=self.target_model,
+            max_workers=max_workers,
+            batch_size=batch_size,
+        )
+
+    def _optimize_repository(
+        self, context, queries: List[Optional[str]], start_time: float, max_tokens: Optional[int] = None
+    ) -> List[OptimizedContext]:
+        """Search the repository index and return the best chunks with their locations."""
+        self._lazy_load_deps()
+        orig_tokens = self.index.total_tokens
+        if self.model_load_failed:
+            return self._fallbacks(queries, str(context), orig_tokens, start_time, "model_load_failed")
+        if not len(self.index):
+            return self._fallbacks(queries, str(context), orig_tokens, start_time, "empty_index")
+        if self.index.model_name != self.model_name:
+            raise OptimizerError(
+                f"Index was built with '{self.index.model_name}', but this optimizer uses '{self.model_name}'"
+            )
+
+        query_emb, query_details = self._encode_queries(queries)
+        all_hits = self.index.search(query_emb, self._candidate_count())
+        search_details = {**self.index.search_details(), **query_details}
+
+        optimized = []
+        for hits in all_hits:
+            candidates = [
+                {
+                    "code": f"# {hit['path']}:{hit['lineno']}-{hit['end_lineno']}\n{self.index.read_chunk(hit)}",
+                    "distance": hit["distance"],
+                    "score": 1.0 / (1.0 + hit["distance"]),
+                    "tokens": None,
+                    "span": (hit["path"], hit["lineno"], hit["end_lineno"]),
+                    "hit": hit,
+                }
+                for hit in hits
+            ]
+            selected, removed = self._select(candidates, max_tokens)
+            details = {
+                **removed,
+                "results": [
+                    {key: c["hit"][key] for key in ("path", "name", "type", "lineno", "end_lineno", "distance")}
+                    for c in selected
+                ],
+                **search_details,
+            }
+            optimized.append(
+                self._build_result(selected, orig_tokens, "semantic_repository", details, start_time, max_tokens)
+            )
+        return optimized
+
+    def _embed_chunks(self, codes: List[str]):
+        """Embed code chunks as float32, reusing cached vectors when a cache is configured."""
+        np = self._numpy
+        if self.embedding_cache is None:
+            return np.asarray(self._model.encode(codes), dtype=np.float32), {}
+
+        embeddings, stats = self.embedding_cache.encode(self.model_name, codes, self._model.encode)
+        total = stats["hits"] + stats["misses"]
+        return embeddings, {
+            "embedding_cache_hits": stats["hits"],
+            "embedding_cache_misses": stats["misses"],
+            "embedding_cache_hit_ratio": stats["hits"] / total if total else 0.0,
+        }
+
+    def _fallbacks(self, queries, content, tokens, start_time, reason) -> List[OptimizedContext]:
+        return [self._create_fallback_context(content, tokens, start_time, reason) for _ in queries]
+
     def _create_fallback_context(self, content, tokens, start_time, reason):
         """Helper to create consistent fallback response."""
         return OptimizedContext(
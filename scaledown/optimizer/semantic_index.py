@@ -0,0 +1,441 @@
+"""
+Repository-scale semantic index for SemanticOptimizer.
+"""
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scaledown.exceptions import OptimizerError
+from scaledown.optimizer.ann_index import VectorSearch
+from scaledown.types.metrics import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Directories never worth indexing
+DEFAULT_EXCLUDE = (".git", ".hg", ".svn", "__pycache__", ".venv", "venv", "node_modules", ".tox", ".mypy_cache")
+
+# Rows allocated when the vector file is first created
+_INITIAL_CAPACITY = 1024
+
+# Rows moved at a time when compacting, bounding the memory used
+_COPY_BLOCK_ROWS = 8192
+
+
+def _parse_file(root: str, rel_path: str, target_model: str) -> Optional[Dict[str, Any]]:
+    """Read, hash and chunk one file, or None if it cannot be read. Runs in a worker thread."""
+    from .semantic_code import extract_semantic_units
+
+    path = os.path.join(root, rel_path)
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        logger.warning(f"Skipping {rel_path}: {e}")
+        return None
+    record: Dict[str, Any] = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha": hashlib.sha256(raw).hexdigest(),
+    }
+    try:
+        source = raw.decode("utf-8")
+        units = extract_semantic_units(source, os.path.basename(rel_path))
+    except (UnicodeDecodeError, SyntaxError, ValueError) as e:
+        logger.warning(f"Skipping {rel_path}: {e}")
+        record.update(tokens=0, units=[])
+        return record
+
+    record["tokens"] = count_tokens(source, model=target_model)
+    record["units"] = [u for u in units if u["type"] != "file" and u.get("code")]
+    return record
+
+
+class RepositoryIndex:
+    """
+    Persistent, incrementally updated embedding index over a source tree.
+
+    Every function and class in the tree gets a stable integer chunk id.
+    ``update`` re-scans the tree, skipping files whose mtime and size are
+    unchanged, and only re-embeds files whose content hash changed. Vectors
+    of edited files are replaced, and vectors of deleted files are removed.
+    Files that cannot be read, such as broken symlinks, are left out.
+
+    Vectors live in a memory-mapped ``vectors.npy`` with spare rows: new
+    vectors are appended in place and removed ones are compacted away block
+    by block, so an update costs I/O in proportion to what changed rather
+    than to the size of the index.
+
+    Parameters
+    ----------
+    index_dir : str
+        Directory where vectors and metadata are persisted.
+    patterns : Sequence[str], default=('*.py',)
+        Glob patterns of files to index.
+    exclude : Sequence[str], optional
+        Directory names to skip while walking the tree.
+    index_type : str, default='flat'
+        FAISS index used for search: 'flat', 'ivf', 'hnsw' or 'ivfpq'.
+    index_params : dict, optional
+        Keyword arguments for ``build_index``, e.g. ``{"nprobe": 16}``.
+    vector_dtype, truncate_dim, rescore_factor
+        Reduced-size storage for the search index; see ``VectorSearch``.
+        Full-precision vectors stay on disk and are memory-mapped for
+        re-scoring.
+
+    Example
+    -------
+    >>> index = RepositoryIndex(".scaledown_index")
+    >>> opt = SemanticOptimizer(index=index)
+    >>> opt.index_repository("path/to/repo")      # first run embeds everything
+    >>> opt.index_repository("path/to/repo")      # later runs embed changed files only
+    >>> result = opt.optimize(context="", query="where are tokens refreshed?")
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        patterns: Sequence[str] = ("*.py",),
+        exclude: Sequence[str] = DEFAULT_EXCLUDE,
+        index_type: str = "flat",
+        index_params: Optional[Dict[str, Any]] = None,
+        vector_dtype: str = "float32",
+        truncate_dim: Optional[int] = None,
+        rescore_factor: int = 4,
+    ):
+        self.index_dir = os.path.abspath(os.path.expanduser(index_dir))
+        self.patterns = tuple(patterns)
+        self.exclude = set(exclude)
+        self.index_type = index_type
+        self.index_params = dict(index_params or {})
+        self.vector_dtype = vector_dtype
+        self.truncate_dim = truncate_dim
+        self.rescore_factor = rescore_factor
+
+        self.root: Optional[str] = None
+        self.model_name: Optional[str] = None
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.chunks: Dict[int, Dict[str, Any]] = {}
+        self.next_id = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors: Optional[np.ndarray] = None
+        # Writable map of vectors.npy, rows beyond len(ids) are spare capacity
+        self._store: Optional[np.ndarray] = None
+
+        self._search_index = None
+        self._lock = threading.RLock()
+        self._load()
+
+    # Persistence
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.index_dir, "index.json")
+
+    def _load(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.root = meta["root"]
+        self.model_name = meta["model_name"]
+        self.files = meta["files"]
+        self.chunks = {int(k): v for k, v in meta["chunks"].items()}
+        self.next_id = meta["next_id"]
+        self.ids = np.load(os.path.join(self.index_dir, "ids.npy"))
+        self._map_vectors()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.index_dir, "vectors.npy")
+
+    def _map_vectors(self) -> None:
+        # Full-precision vectors are only read for re-scoring, so leave them on disk
+        self._store = None
+        if os.path.exists(self._vectors_path):
+            self.vectors = np.load(self._vectors_path, mmap_mode="r")[:len(self.ids)]
+        else:
+            self.vectors = None
+
+    def save(self) -> None:
+        """Persist the index to ``index_dir``."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with self._lock:
+            if self._store is not None:
+                self._store.flush()
+            self._atomic_write("ids.npy", lambda f: np.save(f, self.ids))
+            meta = {
+                "root": self.root,
+                "model_name": self.model_name,
+                "files": self.files,
+                "chunks": self.chunks,
+                "next_id": self.next_id,
+            }
+            self._atomic_write("index.json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    def _atomic_write(self, name: str, write: Callable[[Any], Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, os.path.join(self.index_dir, name))
+
+    # Ingestion
+
+    def _walk(self, root: str) -> Iterator[str]:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in self.exclude)
+            for filename in sorted(filenames):
+                if any(fnmatch.fnmatch(filename, p) for p in self.patterns):
+                    yield os.path.relpath(os.path.join(dirpath, filename), root)
+
+    def update(
+        self,
+        root: str,
+        encode: Callable[[List[str]], np.ndarray],
+        model_name: str,
+        target_model: str = "gpt-4o",
+        max_workers: Optional[int] = None,
+        batch_size: int = 256,
+    ) -> Dict[str, int]:
+        """
+        Bring the index in sync with the tree under ``root``.
+
+        Parameters
+        ----------
+        root : str
+            Repository root. Paths in results are relative to it.
+        encode : callable
+            Maps a list of code chunks to an embedding matrix.
+        model_name : str
+            Name of the embedding model; an index only holds one model's vectors.
+        target_model : str, default='gpt-4o'
+            Model whose tokenizer is used for file token counts.
+        max_workers : int, optional
+            Threads used to read, hash and parse files.
+        batch_size : int, default=256
+            Number of chunks embedded per ``encode`` call.
+
+        Returns
+        -------
+        Dict[str, int]
+            Number of files ``added``, ``updated``, ``removed`` and ``unchanged``.
+        """
+        root = os.path.abspath(root)
+        with self._lock:
+            if self.model_name not in (None, model_name) or self.root not in (None, root):
+                raise OptimizerError(
+                    f"Index at {self.index_dir} was built for {self.root} with {self.model_name}; "
+                    "use a separate index_dir"
+                )
+            self.root, self.model_name = root, model_name
+
+            stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+            present = set()
+            candidates = []
+            for rel_path in self._walk(root):
+                record = self.files.get(rel_path)
+                try:
+                    stat = os.stat(os.path.join(root, rel_path))
+                except OSError as e:
+                    logger.warning(f"Skipping {rel_path}: {e}")
+                    continue
+                present.add(rel_path)
+                if record and record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+                    stats["unchanged"] += 1
+                else:
+                    candidates.append(rel_path)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                parsed = list(executor.map(lambda p: (p, _parse_file(root, p, target_model)), candidates))
+            present -= {rel_path for rel_path, record in parsed if record is None}
+            parsed = [(rel_path, record) for rel_path, record in parsed if record is not None]
+
+            removed = set(self.files) - present
+            stats["removed"] = len(removed)
+
+            # Plan every change first; the index is only modified once all vectors are encoded,
+            # so a failing encode leaves it as it was and a retry sees the same files as changed
+            touched, replaced, chunks = [], {}, {}
+            pending: List[Tuple[int, str]] = []
+            next_id = self.next_id
+            for rel_path, record in parsed:
+                previous = self.files.get(rel_path)
+                if previous and previous["sha"] == record["sha"]:
+                    # Touched but not edited
+                    touched.append((previous, record))
+                    stats["unchanged"] += 1
+                    continue
+
+                stats["updated" if previous else "added"] += 1
+                ids = []
+                for unit in record.pop("units"):
+                    ids.append(next_id)
+                    chunks[next_id] = {
+                        "path": rel_path,
+                        "name": unit["name"],
+                        "type": unit["type"],
+                        "lineno": unit["metadata"]["lineno"],
+                        "end_lineno": unit["metadata"]["end_lineno"],
+                    }
+                    pending.append((next_id, unit["code"]))
+                    next_id += 1
+                record["ids"] = ids
+                replaced[rel_path] = record
+
+            batches = []
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                vectors = np.asarray(encode([code for _, code in batch]), dtype=np.float32)
+                batches.append((np.array([i for i, _ in batch], dtype=np.int64), vectors))
+
+            if not (removed or touched or replaced):
+                logger.info(f"Indexed {root}: {stats}")
+                return stats
+
+            stale = [i for rel_path in removed for i in self.files.pop(rel_path)["ids"]]
+            for previous, record in touched:
+                previous.update(mtime_ns=record["mtime_ns"], size=record["size"])
+            for rel_path, record in replaced.items():
+                if rel_path in self.files:
+                    stale.extend(self.files[rel_path]["ids"])
+                self.files[rel_path] = record
+            try:
+                self._remove_ids(stale)
+                self.chunks.update(chunks)
+                self.next_id = next_id
+                for ids, vectors in batches:
+                    self._add_vectors(ids, vectors)
+                self.save()
+            finally:
+                self._map_vectors()
+        logger.info(f"Indexed {root}: {stats}")
+        return stats
+
+    def _writable_store(self) -> Optional[np.ndarray]:
+        if self._store is None and os.path.exists(self._vectors_path):
+            self._store = np.load(self._vectors_path, mmap_mode="r+")
+        return self._store
+
+    def _add_vectors(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        if not len(ids):
+            return
+        count = len(self.ids)
+        store = self._writable_store()
+        capacity = 0 if store is None else store.shape[0]
+        if count + len(ids) > capacity:
+            # Grow into a new file, streaming the existing rows across
+            os.makedirs(self.index_dir, exist_ok=True)
+            new_capacity = max(_INITIAL_CAPACITY, capacity * 2, count + len(ids))
+            fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+            os.close(fd)
+            grown = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=np.float32, shape=(new_capacity, vectors.shape[1])
+            )
+            for start in range(0, count, _COPY_BLOCK_ROWS):
+                grown[start:min(start + _COPY_BLOCK_ROWS, count)] = store[start:min(start + _COPY_BLOCK_ROWS, count)]
+            grown.flush()
+            del grown
+            self._store = store = None
+            os.replace(tmp_path, self._vectors_path)
+            store = self._writable_store()
+
+        store[count:count + len(ids)] = vectors
+        self.ids = np.concatenate([self.ids, ids])
+        self._search_index = None
+
+    def _remove_ids(self, ids: Sequence[int]) -> None:
+        if not ids:
+            return
+        for chunk_id in ids:
+            self.chunks.pop(chunk_id, None)
+        keep = ~np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+        store = self._writable_store()
+        if store is not None and not keep.all():
+            # Slide the surviving rows down in place, one block at a time
+            write = first = int(np.argmin(keep))
+            for start in range(first, len(keep), _COPY_BLOCK_ROWS):
+                block = np.flatnonzero(keep[start:start + _COPY_BLOCK_ROWS]) + start
+                store[write:write + len(block)] = store[block]
+                write += len(block)
+        self.ids = self.ids[keep]
+        self._search_index = None
+
+    # Querying
+
+    def _get_search_index(self):
+        if self._search_index is None:
+            self._search_index = VectorSearch(
+                self.vectors, self.index_type, self.index_params,
+                self.vector_dtype, self.truncate_dim, self.rescore_factor,
+            )
+        return self._search_index
+
+    def search_details(self) -> Dict[str, Any]:
+        """Search index settings and memory, for ``OptimizerMetrics.details``."""
+        with self._lock:
+            if self.vectors is None or not len(self.ids):
+                return {}
+            return self._get_search_index().details()
+
+    def search(self, query_vectors: np.ndarray, k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Find the ``k`` nearest chunks for each query vector.
+
+        Returns
+        -------
+        List[List[Dict[str, Any]]]
+            Per query, chunk metadata (``path``, ``name``, ``type``,
+            ``lineno``, ``end_lineno``) with its ``distance``, best first.
+        """
+        with self._lock:
+            if self.vectors is None or not len(self.ids):
+                return [[] for _ in range(len(query_vectors))]
+            index = self._get_search_index()
+            distances, positions = index.search(
+                np.asarray(query_vectors, dtype=np.float32), min(k, len(self.ids))
+            )
+            results = []
+            for row_distances, row_positions in zip(distances, positions):
+                hits = []
+                for distance, position in zip(row_distances, row_positions):
+                    if position == -1:
+                        continue
+                    chunk_id = int(self.ids[position])
+                    hits.append({"id": chunk_id, "distance": float(distance), **self.chunks[chunk_id]})
+                results.append(hits)
+            return results
+
+    def read_chunk(self, hit: Dict[str, Any]) -> str:
+        """Read a chunk's source lines from the repository."""
+        path = os.path.join(self.root, hit["path"])
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        return "\n".join(lines[hit["lineno"] - 1:hit["end_lineno"]])
+
+    @property
+    def total_tokens(self) -> int:
+        """Token count of every indexed file."""
+        return sum(record.get("tokens", 0) for record in self.files.values())
+
+    def fingerprint(self) -> Tuple:
+        """Identifies the indexed contents and settings, e.g. for ``StepCache`` keys."""
+        with self._lock:
+            return (
+                self.index_dir, self.model_name, self.next_id, len(self.ids),
+                self.index_type, sorted(self.index_params.items()), self.vector_dtype, self.truncate_dim,
+                self.rescore_factor,
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f"RepositoryIndex(index_dir={self.index_dir!r}, files={len(self.files)}, chunks={len(self)})"
@@ -1,9 +1,80 @@
-from typing import List, Tuple, Union, Optional
+import contextvars
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union, Optional
 from scaledown.optimizer.base import BaseOptimizer
 from scaledown.compressor.base import BaseCompressor
-from scaledown.types import OptimizedContext, CompressedPrompt
+from scaledown.types import OptimizedContext, CompressedPrompt, OptimizerMetrics
 from scaledown.types import PipelineResult, StepMetadata
-from scaledown.types.metrics import count_tokens
+from scaledown.types.metrics import TokenCounter, count_tokens
+from scaledown.types.context_source import ContextSource, materialize
+from scaledown.cache import StepCache
+from scaledown.callbacks import PipelineCallback, _emit
+from scaledown.profiling import StepProfiler, profile_thread
+from scaledown.deadline import deadline_at, remaining_time, _DEADLINE
+from scaledown.exceptions import PipelineError
+
+# Poll interval for stream workers, so they notice when the consumer goes away.
+_STREAM_POLL_SECONDS = 0.1
+
+# Timed-out steps a pipeline lets keep running in the background at once
+_MAX_ABANDONED_STEPS = 8
+
+
+@dataclass
+class _StreamItem:
+    """A context travelling through ``Pipeline.stream``."""
+    original: str
+    content: str
+    history: List[StepMetadata]
+    tokens: Optional[int] = None
+    # Seconds of ``timeout`` left; only time spent in steps counts against it
+    remaining: Optional[float] = None
+    counter: Optional[TokenCounter] = None
+
+
+@dataclass
+class _StreamFailure:
+    """An error raised upstream, forwarded to the consumer in order."""
+    error: BaseException
+
+
+_STREAM_DONE = object()
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event) -> bool:
+    """Block until ``item`` is queued; return False if the stream was closed."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_STREAM_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: "queue.Queue", stop: threading.Event) -> Any:
+    """Block until an item is available; return None if the stream was closed."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_STREAM_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return None
+
+
+def _step_type(component: Any) -> str:
+    """Classify a pipeline step for its metadata."""
+    if isinstance(component, BaseOptimizer):
+        return "optimization"
+    if isinstance(component, BaseCompressor):
+        return "compression"
+    return "custom"
+
 
 class Pipeline:
     """
@@ -23,7 +94,17 @@ class Pipeline:
     >>> result = pipe.run(context=code, query="Add type hints", prompt="Explain changes")
     """
     
-    def __init__(self, steps: List[Tuple[str, Union[BaseOptimizer, BaseCompressor]]]):
+    def __init__(
+        self,
+        steps: List[Tuple[str, Union[BaseOptimizer, BaseCompressor]]],
+        memory: Optional[Union[str, StepCache]] = None,
+        max_tokens: Optional[int] = None,
+        callbacks: Optional[List[PipelineCallback]] = None,
+        timeout: Optional[float] = None,
+        step_timeouts: Optional[Dict[str, float]] = None,
+        on_timeout: str = "passthrough",
+        fallbacks: Optional[Dict[str, Union[BaseOptimizer, BaseCompressor]]] = None
+    ):
         """
         Initialize pipeline with ordered steps.
         
@@ -31,8 +112,52 @@ class Pipeline:
         ----------
         steps : List[Tuple[str, Union[BaseOptimizer, BaseCompressor]]]
             List of (name, transformer) tuples
+        memory : str or StepCache, optional
+            Cache step outputs on disk. A string is used as the cache
+            directory. Steps whose input and configuration are unchanged are
+            served from the cache and marked with ``details["cached"]``.
+        max_tokens : int, optional
+            Token budget for the pipeline output. Once the running token
+            count is within budget, the remaining steps are skipped and
+            marked with ``details["skipped"]``. This is separate from a
+            ``max_tokens`` passed to ``run``, which is forwarded to each step.
+        callbacks : List[PipelineCallback], optional
+            Hooks notified when runs and steps start, end or fail, e.g.
+            ``OpenTelemetryCallback`` for tracing spans.
+        timeout : float, optional
+            Overall deadline in seconds for a run, or for the time each item
+            of ``stream`` spends in steps (waiting in buffers does not count).
+            The remaining time is propagated to every step via
+            ``scaledown.deadline.remaining_time()``. Callers can also wrap
+            ``run`` in ``scaledown.deadline.deadline(seconds)``.
+        step_timeouts : Dict[str, float], optional
+            Per-step timeouts in seconds, keyed by step name.
+        on_timeout : str, default='passthrough'
+            What to do when a step runs out of time and has no fallback:
+            ``'passthrough'`` forwards the step's input unchanged,
+            ``'raise'`` raises ``PipelineError``.
+        fallbacks : Dict[str, step], optional
+            Cheaper alternate steps, keyed by step name, run in place of a
+            step that timed out.
+
+        Notes
+        -----
+        A step that times out cannot be interrupted. It is abandoned and keeps
+        running in a daemon thread while the pipeline moves on. At most eight
+        abandoned steps run at once per pipeline; beyond that, timed steps
+        take their timeout path straight away instead of starting another
+        thread, so sustained overload sheds work rather than piling it up.
         """
         self.steps = steps
+        self.memory = StepCache(memory) if isinstance(memory, str) else memory
+        self.max_tokens = max_tokens
+        self.callbacks = list(callbacks or [])
+        self.timeout = timeout
+        self.step_timeouts = dict(step_timeouts or {})
+        self.on_timeout = on_timeout
+        self.fallbacks = dict(fallbacks or {})
+        self._abandoned = 0
+        self._abandoned_lock = threading.Lock()
         self._validate_steps()
     
     def _validate_steps(self):
@@ -50,60 +175,423 @@ class Pipeline:
                     f"Optimizer '{name}' cannot come after a compressor. "
                     "Pipeline order must be: optimizers -> compressors"
                 )
-    def run(self, context: str, **kwargs) -> PipelineResult:
+
+        step_names = {name for name, _ in self.steps}
+        for option in ("step_timeouts", "fallbacks"):
+            unknown = set(getattr(self, option)) - step_names
+            if unknown:
+                raise ValueError(f"{option} refers to unknown steps: {sorted(unknown)}")
+        if self.on_timeout not in ("passthrough", "raise"):
+            raise ValueError("on_timeout must be 'passthrough' or 'raise'")
+    def run(
+        self,
+        context: Union[str, ContextSource],
+        profile: bool = False,
+        cprofile_dir: Optional[str] = None,
+        **kwargs
+    ) -> PipelineResult:
+        """
+        Run every step on ``context``.
+
+        Parameters
+        ----------
+        context : str or ContextSource
+            Input context for the first step. A ``ContextSource`` (e.g.
+            ``FileSource`` or ``MmapSource``) is read by path by file-based
+            optimizers and only decoded for steps that need the text. It is
+            closed when the run ends and kept as ``original_content``.
+        profile : bool, default=False
+            Measure wall time, CPU time and peak traced memory per step and
+            attach them to ``PipelineResult.profile``. Render them with
+            ``result.profile.to_table(baseline=previous.profile)`` to compare runs.
+        cprofile_dir : str, optional
+            Also run each step under cProfile and dump its stats to this
+            directory. Implies ``profile=True``.
+        **kwargs : dict
+            Arguments forwarded to every step (e.g. ``query``, ``prompt``, ``file_path``)
+
+        Returns
+        -------
+        PipelineResult
+            Final content with per-step history
+        """
+        # A fresh counter per run, so each distinct string is only tokenized once
+        with deadline_at(self._deadline()), TokenCounter().active():
+            try:
+                return self._run_with_callbacks(context, profile, cprofile_dir, kwargs)
+            finally:
+                if isinstance(context, ContextSource):
+                    # Release memory maps; the source reopens if read again
+                    context.close()
+
+    def _run_with_callbacks(
+        self,
+        context: str,
+        profile: bool,
+        cprofile_dir: Optional[str],
+        kwargs: Dict[str, Any]
+    ) -> PipelineResult:
+        callbacks = self.callbacks
+        profiler = None
+        if profile or cprofile_dir:
+            profiler = StepProfiler(cprofile_dir=cprofile_dir)
+            callbacks = callbacks + [profiler]
+
+        if not callbacks:
+            return self._run(context, kwargs, callbacks)
+
+        _emit(callbacks, "on_run_start", self, context)
+        try:
+            result = self._run(context, kwargs, callbacks)
+        except Exception as e:
+            _emit(callbacks, "on_run_error", self, e)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.finish()
+        if profiler is not None:
+            result.profile = profiler.profile()
+        _emit(callbacks, "on_run_end", self, result)
+        return result
+
+    def _run(self, context: str, kwargs: Dict[str, Any], callbacks: List[PipelineCallback]) -> PipelineResult:
         current_context = context
         original_context = context
         history: List[StepMetadata] = []
+        tokens = self._initial_tokens(context, kwargs)
 
         for name, component in self.steps:
-            step_type = "custom"
-            inp, out, lat = 0, 0, 0.0
-            
-            # OPTIMIZER
-            if isinstance(component, BaseOptimizer):
-                step_type = "optimization"
-                result = component.optimize(
-                    context=current_context,
-                    **kwargs
-                )
-                inp = getattr(result.metrics, 'original_tokens', 0)
-                out = getattr(result.metrics, 'optimized_tokens', 0)
-                lat = getattr(result.metrics, 'latency_ms', 0.0)
-                current_context = result.content
-            
-            # COMPRESSOR
-            elif isinstance(component, BaseCompressor):
-                step_type = "compression"
-                result = component.compress(
-                    context=current_context,
-                    **kwargs
-                )
-                inp = result.tokens[0]
-                out = result.tokens[1]
-                lat = result.latency
-                current_context = result.content
-            
-            # UNKNOWN
-            else:
-                output = component(current_context, **kwargs)
-                inp = count_tokens(current_context)
-                out = count_tokens(output)
-                current_context = output
-            
-            history.append(StepMetadata(
-                step_name=name,
-                input_tokens=inp,
-                output_tokens=out,
-                latency_ms=lat,
-                details={"type": step_type, "component": component.__class__.__name__}
-            ))
+            current_context, metadata = self._run_step(name, component, current_context, kwargs, tokens, callbacks)
+            history.append(metadata)
+            tokens = metadata.output_tokens
 
         return PipelineResult(
-            final_content=current_context,
+            final_content=materialize(current_context),
             original_content=original_context,
             history=history
         )
-    
+
+    def stream(self, contexts: Iterable[str], buffer_size: int = 8, **kwargs) -> Iterator[PipelineResult]:
+        """
+        Run the pipeline over an iterable of contexts, yielding results as they complete.
+
+        Every step runs in its own worker thread and hands items to the next
+        step through a bounded queue, so a slow compressor blocks upstream
+        optimizers once its buffer is full instead of letting items pile up in
+        memory. Meanwhile, earlier steps keep working on later items.
+
+        Parameters
+        ----------
+        contexts : Iterable[str]
+            Contexts to process. Consumed lazily, so generators over large
+            corpora are never materialized.
+        buffer_size : int, default=8
+            Maximum number of items queued in front of each step.
+        **kwargs : dict
+            Arguments forwarded to every step, as in ``run``.
+
+        Yields
+        ------
+        PipelineResult
+            One result per input context, in input order.
+
+        Example
+        -------
+        >>> for result in pipe.stream(read_documents(), query="auth flow", prompt="Summarize"):
+        ...     print(result.final_tokens)
+        """
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be at least 1")
+
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=buffer_size) for _ in range(len(self.steps) + 1)]
+
+        def feed():
+            try:
+                for context in contexts:
+                    item = _StreamItem(context, context, [], remaining=self.timeout, counter=TokenCounter())
+                    with item.counter.active():
+                        item.tokens = self._initial_tokens(context, kwargs)
+                    if not _put(queues[0], item, stop):
+                        return
+            except Exception as e:
+                _put(queues[0], _StreamFailure(e), stop)
+                return
+            _put(queues[0], _STREAM_DONE, stop)
+
+        def work(name, component, inbox, outbox):
+            while True:
+                item = _get(inbox, stop)
+                if item is None:
+                    return
+                if isinstance(item, _StreamItem):
+                    try:
+                        # The clock runs while the item is in a step, not while it waits in a buffer
+                        at = None if item.remaining is None else time.monotonic() + item.remaining
+                        with deadline_at(at), item.counter.active():
+                            item.content, metadata = self._run_step(
+                                name, component, item.content, kwargs, item.tokens, self.callbacks
+                            )
+                        if at is not None:
+                            item.remaining = max(at - time.monotonic(), 0.0)
+                        item.history.append(metadata)
+                        item.tokens = metadata.output_tokens
+                    except Exception as e:
+                        item = _StreamFailure(e)
+                if not _put(outbox, item, stop) or item is _STREAM_DONE:
+                    return
+
+        threads = [threading.Thread(target=feed, name="scaledown-stream-feed", daemon=True)]
+        for i, (name, component) in enumerate(self.steps):
+            threads.append(threading.Thread(
+                target=work,
+                args=(name, component, queues[i], queues[i + 1]),
+                name=f"scaledown-stream-{name}",
+                daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _STREAM_DONE:
+                    return
+                if isinstance(item, _StreamFailure):
+                    raise item.error
+                final_content = materialize(item.content)
+                if isinstance(item.original, ContextSource):
+                    item.original.close()
+                yield PipelineResult(
+                    final_content=final_content,
+                    original_content=item.original,
+                    history=item.history
+                )
+        finally:
+            stop.set()
+
+    def _run_step(
+        self,
+        name: str,
+        component: Union[BaseOptimizer, BaseCompressor],
+        context: str,
+        kwargs: Dict[str, Any],
+        tokens: Optional[int] = None,
+        callbacks: Optional[List[PipelineCallback]] = None
+    ) -> Tuple[str, StepMetadata]:
+        """
+        Run a single step and return its output along with its metadata.
+
+        ``tokens`` is the running token count of ``context``, taken from the
+        previous step's metrics. It is only tracked when a budget is set.
+        """
+        if callbacks:
+            _emit(callbacks, "on_step_start", name, component)
+
+        start_time = time.perf_counter()
+        try:
+            output, metadata = self._apply_step(name, component, context, kwargs, tokens)
+        except Exception as e:
+            if callbacks:
+                _emit(callbacks, "on_step_error", name, component, e)
+            raise
+        metadata.details["wall_ms"] = (time.perf_counter() - start_time) * 1000
+
+        if callbacks:
+            _emit(callbacks, "on_step_end", name, component, metadata)
+        return output, metadata
+
+    def _apply_step(
+        self,
+        name: str,
+        component: Union[BaseOptimizer, BaseCompressor],
+        context: str,
+        kwargs: Dict[str, Any],
+        tokens: Optional[int] = None
+    ) -> Tuple[str, StepMetadata]:
+        """Honor the token budget and step cache before executing a step."""
+        if self.max_tokens is not None and tokens is not None and tokens <= self.max_tokens:
+            return context, StepMetadata(
+                step_name=name,
+                input_tokens=tokens,
+                output_tokens=tokens,
+                latency_ms=0.0,
+                details={
+                    "type": _step_type(component),
+                    "component": component.__class__.__name__,
+                    "skipped": True,
+                    "reason": "within_budget"
+                }
+            )
+
+        if self.memory is None:
+            return self._execute_with_timeout(name, component, context, kwargs, tokens)
+
+        start_time = time.time()
+        key = self.memory.key(component, context, kwargs)
+        if key is None:
+            # Not safely cacheable, e.g. a closure over a variable not yet bound
+            return self._execute_with_timeout(name, component, context, kwargs, tokens)
+        cached = self.memory.get(key)
+        if cached is not None:
+            output, metadata = cached
+            return output, replace(
+                metadata,
+                step_name=name,
+                latency_ms=(time.time() - start_time) * 1000,
+                details={**metadata.details, "cached": True}
+            )
+
+        output, metadata = self._execute_with_timeout(name, component, context, kwargs, tokens)
+        if not metadata.details.get("timed_out"):
+            self.memory.set(key, output, metadata)
+        return output, metadata
+
+    def _execute_with_timeout(
+        self,
+        name: str,
+        component: Union[BaseOptimizer, BaseCompressor],
+        context: str,
+        kwargs: Dict[str, Any],
+        tokens: Optional[int] = None
+    ) -> Tuple[str, StepMetadata]:
+        """Execute a step within its timeout and the run deadline, falling back if it overruns."""
+        limits = [t for t in (self.step_timeouts.get(name), remaining_time()) if t is not None]
+        if not limits:
+            return self._execute_step(name, component, context, kwargs)
+
+        start_time = time.time()
+        budget = min(limits)
+        with self._abandoned_lock:
+            overloaded = self._abandoned >= _MAX_ABANDONED_STEPS
+        if budget > 0 and not overloaded:
+            outcome: Dict[str, Any] = {}
+            finished = threading.Event()
+
+            def target():
+                try:
+                    with profile_thread():
+                        outcome["value"] = self._execute_step(name, component, context, kwargs)
+                except BaseException as e:
+                    outcome["error"] = e
+                finally:
+                    with self._abandoned_lock:
+                        finished.set()
+                        if outcome.get("abandoned"):
+                            self._abandoned -= 1
+
+            # Run in a copy of the current context so the step sees its own deadline
+            step_context = contextvars.copy_context()
+            step_context.run(_DEADLINE.set, time.monotonic() + budget)
+            threading.Thread(
+                target=step_context.run,
+                args=(target,),
+                name=f"scaledown-step-{name}",
+                daemon=True
+            ).start()
+
+            finished.wait(budget)
+            with self._abandoned_lock:
+                if not finished.is_set():
+                    outcome["abandoned"] = True
+                    self._abandoned += 1
+            if finished.is_set():
+                if "error" in outcome:
+                    raise outcome["error"]
+                return outcome["value"]
+
+        # Out of time
+        if name in self.fallbacks:
+            fallback = self.fallbacks[name]
+            output, metadata = self._execute_step(name, fallback, context, kwargs)
+            metadata.details.update({"timed_out": True, "fallback": fallback.__class__.__name__})
+            return output, metadata
+
+        if self.on_timeout == "raise":
+            raise PipelineError(f"Step '{name}' did not finish within {budget:.3f}s")
+
+        if tokens is None:
+            tokens = count_tokens(materialize(context))
+        return context, StepMetadata(
+            step_name=name,
+            input_tokens=tokens,
+            output_tokens=tokens,
+            latency_ms=(time.time() - start_time) * 1000,
+            details={
+                "type": _step_type(component),
+                "component": component.__class__.__name__,
+                "timed_out": True,
+                "fallback": "passthrough"
+            }
+        )
+
+    def _execute_step(
+        self,
+        name: str,
+        component: Union[BaseOptimizer, BaseCompressor],
+        context: str,
+        kwargs: Dict[str, Any]
+    ) -> Tuple[str, StepMetadata]:
+        """Execute a step's component and collect its metrics."""
+        step_type = _step_type(component)
+        inp, out, lat = 0, 0, 0.0
+        extra: Dict[str, Any] = {}
+        if not getattr(component, "supports_context_sources", False):
+            context = materialize(context)
+
+        # OPTIMIZER
+        if isinstance(component, BaseOptimizer):
+            result = component.optimize(
+                context=context,
+                **kwargs
+            )
+            inp = getattr(result.metrics, 'original_tokens', 0)
+            out = getattr(result.metrics, 'optimized_tokens', 0)
+            lat = getattr(result.metrics, 'latency_ms', 0.0)
+            extra = getattr(result.metrics, 'details', None) or {}
+            output = result.content
+
+        # COMPRESSOR
+        elif isinstance(component, BaseCompressor):
+            result = component.compress(
+                context=context,
+                **kwargs
+            )
+            inp = result.tokens[0]
+            out = result.tokens[1]
+            lat = result.latency
+            output = result.content
+
+        # UNKNOWN
+        else:
+            output = component(context, **kwargs)
+            inp = count_tokens(context)
+            out = count_tokens(output)
+
+        return output, StepMetadata(
+            step_name=name,
+            input_tokens=inp,
+            output_tokens=out,
+            latency_ms=lat,
+            details={"type": step_type, "component": component.__class__.__name__, **extra}
+        )
+
+    def _deadline(self) -> Optional[float]:
+        """Absolute deadline for a run starting now, if ``timeout`` is set."""
+        return time.monotonic() + self.timeout if self.timeout is not None else None
+
+    def _initial_tokens(self, context: str, kwargs: Dict[str, Any]) -> Optional[int]:
+        """
+        Count input tokens up front, only when a budget needs them.
+
+        With a ``file_path`` the steps read their input from the file, so the
+        context says nothing about its size; the count is then left unknown
+        until the first step reports one.
+        """
+        if self.max_tokens is None or kwargs.get("file_path"):
+            return None
+        return count_tokens(materialize(context))
+
     def get_step(self, name: str) -> Union[BaseOptimizer, BaseCompressor]:
         """Get a step by name."""
         for step_name, step in self.steps:
@@ -116,7 +604,7 @@ class Pipeline:
         return f"Pipeline(steps={step_names})"
 
 
-def make_pipeline(steps) -> Pipeline:
+def make_pipeline(steps, **kwargs) -> Pipeline:
     """
     Helper function to create a pipeline.
     
@@ -124,6 +612,8 @@ def make_pipeline(steps) -> Pipeline:
     ----------
     *steps : tuples
         Variable number of (name, transformer) tuples
+    **kwargs : dict
+        Pipeline options such as ``memory`` or ``max_tokens``, see ``Pipeline``
         
     Returns
     -------
@@ -137,4 +627,200 @@ def make_pipeline(steps) -> Pipeline:
     ...     ('compress', ScaleDownCompressor())
     ... )
     """
-    return Pipeline(steps)
+    return Pipeline(steps, **kwargs)
+
+
+# Blank line(s) followed by an unindented line: the boundary between top-level blocks
+_BLOCK_BOUNDARY = re.compile(r"\n\s*\n(?=\S)")
+# Marker lines optimizers place between selected chunks
+_CHUNK_MARKER = re.compile(r"^# \.\.\. \[.*\] \.\.\.$")
+
+
+def _split_blocks(text: str) -> List[str]:
+    """Split optimizer output into top-level code blocks, dropping chunk markers."""
+    blocks = []
+    for block in _BLOCK_BOUNDARY.split(text or ""):
+        block = block.strip("\n")
+        if block.strip() and not _CHUNK_MARKER.match(block.strip()):
+            blocks.append(block)
+    return blocks
+
+
+def _block_lines(block: str) -> Tuple[str, ...]:
+    """A block's non-blank lines without surrounding whitespace, so re-indented copies compare equal."""
+    return tuple(line.strip() for line in block.splitlines() if line.strip())
+
+
+def _encloses(outer: Tuple[str, ...], inner: Tuple[str, ...]) -> bool:
+    """Whether ``inner`` occurs in ``outer`` as a run of whole lines."""
+    n = len(inner)
+    return any(outer[i:i + n] == inner for i in range(len(outer) - n + 1))
+
+
+class OptimizerUnion(BaseOptimizer):
+    """
+    Run several optimizers on the same input concurrently and merge their selections.
+
+    The union is itself an optimizer, so it can be used as a step anywhere an
+    optimizer is allowed. Branches run in parallel threads, so the step takes
+    as long as its slowest branch rather than the sum of all branches.
+
+    Parameters
+    ----------
+    branches : List[Tuple[str, BaseOptimizer]]
+        List of (name, optimizer) tuples run on the same input
+    merge : str, default='dedupe'
+        How branch outputs are combined:
+
+        - ``'dedupe'``: concatenate branch outputs in branch order, dropping
+          code blocks already selected by an earlier branch (including
+          methods already contained in a selected class).
+        - ``'interleave'``: take blocks round-robin across branches, best
+          first, until the token budget is spent.
+    max_tokens : int, optional
+        Token budget for the merged output. Overridden by ``max_tokens``
+        passed at run time.
+
+    Example
+    -------
+    >>> pipe = Pipeline([
+    ...     ('retrieve', OptimizerUnion([
+    ...         ('haste', HasteOptimizer()),
+    ...         ('semantic', SemanticOptimizer()),
+    ...     ], merge='interleave', max_tokens=2000)),
+    ...     ('compressor', ScaleDownCompressor())
+    ... ])
+    """
+
+    MERGE_STRATEGIES = ("dedupe", "interleave")
+    supports_context_sources = True
+
+    def __init__(
+        self,
+        branches: List[Tuple[str, BaseOptimizer]],
+        merge: str = "dedupe",
+        max_tokens: Optional[int] = None,
+        target_model: str = "gpt-4o",
+        **kwargs
+    ):
+        super().__init__(target_model=target_model, **kwargs)
+        if not branches:
+            raise ValueError("OptimizerUnion must have at least one branch")
+        for name, branch in branches:
+            if not isinstance(branch, BaseOptimizer):
+                raise ValueError(f"Branch '{name}' must be an optimizer")
+        if merge not in self.MERGE_STRATEGIES:
+            raise ValueError(f"merge must be one of {self.MERGE_STRATEGIES}, got '{merge}'")
+
+        self.branches = branches
+        self.merge = merge
+        self.max_tokens = max_tokens
+
+    def optimize(
+        self,
+        context: Union[str, List[str]],
+        query: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> OptimizedContext:
+        """
+        Run every branch on ``context`` and merge their outputs.
+
+        All arguments are forwarded to each branch. Per-branch metrics are
+        returned in ``metrics.details["branches"]`` and end up in the
+        pipeline history.
+        """
+        start_time = time.time()
+        budget = max_tokens if max_tokens is not None else self.max_tokens
+
+        def run_branch(branch: BaseOptimizer) -> OptimizedContext:
+            # Sources reach only branches that read them lazily; the rest get text
+            branch_context = context if getattr(branch, "supports_context_sources", False) else materialize(context)
+            return branch.optimize(context=branch_context, query=query, max_tokens=max_tokens, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=len(self.branches)) as executor:
+            # Branches share the caller's deadline and token counter
+            futures = [
+                executor.submit(contextvars.copy_context().run, run_branch, branch)
+                for _, branch in self.branches
+            ]
+            results = [future.result() for future in futures]
+
+        branch_blocks = [_split_blocks(result.content) for result in results]
+        if self.merge == "interleave":
+            blocks = self._interleave(branch_blocks, budget)
+        else:
+            blocks = self._dedupe(branch_blocks)
+
+        content = "\n\n".join(blocks)
+        orig_tokens = max(result.metrics.original_tokens for result in results)
+        opt_tokens = count_tokens(content, model=self.target_model)
+
+        return OptimizedContext(
+            content=content,
+            metrics=OptimizerMetrics(
+                original_tokens=orig_tokens,
+                optimized_tokens=opt_tokens,
+                chunks_retrieved=len(blocks),
+                compression_ratio=orig_tokens / max(opt_tokens, 1),
+                latency_ms=(time.time() - start_time) * 1000,
+                retrieval_mode=f"union_{self.merge}",
+                ast_fidelity=min(result.metrics.ast_fidelity for result in results),
+                details={"branches": [
+                    StepMetadata(
+                        step_name=name,
+                        input_tokens=result.metrics.original_tokens,
+                        output_tokens=result.metrics.optimized_tokens,
+                        latency_ms=result.metrics.latency_ms,
+                        details={
+                            "type": "optimization",
+                            "component": branch.__class__.__name__,
+                            "retrieval_mode": result.metrics.retrieval_mode,
+                        }
+                    )
+                    for (name, branch), result in zip(self.branches, results)
+                ]}
+            )
+        )
+
+    @staticmethod
+    def _add_block(selected: List[str], block: str) -> bool:
+        """Add ``block`` unless it is already covered; return True if added."""
+        lines = _block_lines(block)
+        kept_lines = [_block_lines(kept) for kept in selected]
+        if any(_encloses(kept, lines) for kept in kept_lines):
+            return False
+        # The new block may enclose ones we already have (a class after its method)
+        enclosed = [i for i, kept in enumerate(kept_lines) if _encloses(lines, kept)]
+        if enclosed:
+            selected[enclosed[0]] = block
+            for i in reversed(enclosed[1:]):
+                del selected[i]
+        else:
+            selected.append(block)
+        return True
+
+    def _dedupe(self, branch_blocks: List[List[str]]) -> List[str]:
+        selected: List[str] = []
+        for blocks in branch_blocks:
+            for block in blocks:
+                self._add_block(selected, block)
+        return selected
+
+    def _interleave(self, branch_blocks: List[List[str]], budget: Optional[int]) -> List[str]:
+        selected: List[str] = []
+        for rank in range(max(len(blocks) for blocks in branch_blocks)):
+            for blocks in branch_blocks:
+                if rank >= len(blocks):
+                    continue
+                candidate = list(selected)
+                if not self._add_block(candidate, blocks[rank]):
+                    continue
+                if budget is not None and count_tokens("\n\n".join(candidate), model=self.target_model) > budget:
+                    continue
+                selected = candidate
+        return selected
+
+    def __repr__(self) -> str:
+        branch_names = [name for name, _ in self.branches]
+        return f"OptimizerUnion(branches={branch_names}, merge={self.merge!r})"
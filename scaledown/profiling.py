@@ -0,0 +1,125 @@
+"""
+Per-step resource profiling for Pipeline runs.
+"""
+import cProfile
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from scaledown.callbacks import PipelineCallback
+from scaledown.types import PipelineProfile, StepMetadata, StepProfile
+
+# Profiles of helper threads running the current step, merged into its cProfile dump
+_THREAD_PROFILES: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar(
+    "scaledown_thread_profiles", default=None
+)
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """
+    Profile the current thread into the step's cProfile dump, if one is being recorded.
+
+    cProfile only sees the thread that enabled it, so code that runs a step in
+    another thread (e.g. to enforce a timeout) wraps the step in this.
+    """
+    profiles = _THREAD_PROFILES.get()
+    if profiles is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiles.append(profiler)
+
+
+class StepProfiler(PipelineCallback):
+    """
+    Callback measuring wall time, CPU time and peak traced memory per step.
+
+    Used by ``Pipeline.run(..., profile=True)``. CPU time is process-wide, so
+    it includes work done in helper threads (e.g. ``OptimizerUnion``
+    branches). Peak memory is measured with ``tracemalloc``, which is started
+    on the first step if it is not already tracing and stopped by
+    ``finish``.
+
+    Parameters
+    ----------
+    cprofile_dir : str, optional
+        If given, each step also runs under ``cProfile`` and its stats are
+        dumped to ``<cprofile_dir>/<index>_<step_name>.prof``. Inspect them
+        with ``pstats`` or snakeviz.
+    """
+
+    def __init__(self, cprofile_dir: Optional[str] = None):
+        self.cprofile_dir = cprofile_dir
+        self.steps: List[StepProfile] = []
+        self._started_tracing = False
+        self._active: Dict[str, Tuple[float, float, int, Optional[cProfile.Profile], Any]] = {}
+
+    def on_step_start(self, step_name: str, component: Any) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        profiler = token = None
+        if self.cprofile_dir:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            token = _THREAD_PROFILES.set([])
+        self._active[step_name] = (time.perf_counter(), time.process_time(), current, profiler, token)
+
+    def on_step_end(self, step_name: str, component: Any, metadata: StepMetadata) -> None:
+        self._record(step_name, component)
+
+    def on_step_error(self, step_name: str, component: Any, error: BaseException) -> None:
+        self._record(step_name, component)
+
+    def _record(self, step_name: str, component: Any) -> None:
+        wall_start, cpu_start, memory_start, profiler, token = self._active.pop(step_name)
+        wall_ms = (time.perf_counter() - wall_start) * 1000
+        cpu_ms = (time.process_time() - cpu_start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+
+        cprofile_path = None
+        if profiler is not None:
+            profiler.disable()
+            thread_profiles = _THREAD_PROFILES.get()
+            _THREAD_PROFILES.reset(token)
+            stats = pstats.Stats(profiler)
+            # Threads abandoned on timeout are still running and are left out
+            for thread_profile in thread_profiles:
+                stats.add(thread_profile)
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+            safe_name = re.sub(r"[^\w.-]", "_", step_name)
+            cprofile_path = os.path.join(self.cprofile_dir, f"{len(self.steps):02d}_{safe_name}.prof")
+            stats.dump_stats(cprofile_path)
+
+        self.steps.append(StepProfile(
+            step_name=step_name,
+            component=component.__class__.__name__,
+            wall_ms=wall_ms,
+            cpu_ms=cpu_ms,
+            peak_memory_kb=max(peak - memory_start, 0) / 1024,
+            cprofile_path=cprofile_path
+        ))
+
+    def finish(self) -> None:
+        """Stop tracing if this profiler started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def profile(self) -> PipelineProfile:
+        """Return the steps collected so far."""
+        return PipelineProfile(steps=list(self.steps))
@@ -2,6 +2,8 @@ from .metrics import OptimizerMetrics, CompressorMetrics
 from .optimized_prompt import OptimizedContext
 from .compressed_prompt import CompressedPrompt
 from .pipeline_result import PipelineResult, StepMetadata
+from .profile import PipelineProfile, StepProfile
+from .context_source import ContextSource, FileSource, MmapSource, BytesSource
 
 __all__ = [
     "OptimizerMetrics",
@@ -9,5 +11,11 @@ __all__ = [
     "OptimizedContext",
     "CompressedPrompt",
     "PipelineResult",
-    "StepMetadata"
+    "StepMetadata",
+    "PipelineProfile",
+    "StepProfile",
+    "ContextSource",
+    "FileSource",
+    "MmapSource",
+    "BytesSource"
 ]
\ No newline at end of file
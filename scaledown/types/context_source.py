@@ -0,0 +1,126 @@
+import hashlib
+import mmap
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Optional, Union
+
+class ContextSource(ABC):
+    """
+    A context that steps can consume without first loading it into a string.
+
+    File-based optimizers (``HasteOptimizer``, ``SemanticOptimizer``) read a
+    source through its ``path`` directly. Every other step gets the decoded
+    text, which is materialized on first use and then reused, so a run holds
+    at most one copy of it.
+
+    ``Pipeline.run`` calls ``close`` once it is done with a source; sources
+    can also be used as context managers. A closed source reopens lazily if
+    it is read again.
+    """
+    #: Path of the backing file, if the source lives on disk
+    path: Optional[str] = None
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self._text: Optional[str] = None
+
+    @abstractmethod
+    def buffer(self) -> Union[bytes, memoryview, mmap.mmap]:
+        """Raw bytes of the context, without copying where possible."""
+
+    @abstractmethod
+    def fingerprint(self) -> Any:
+        """Cheap identity of the content, used for cache keys."""
+
+    def text(self) -> str:
+        """Decoded content, materialized once."""
+        if self._text is None:
+            self._text = self._decode()
+        return self._text
+
+    def _decode(self) -> str:
+        return str(self.buffer(), self.encoding)
+
+    def close(self) -> None:
+        """Release any OS resources held by the source."""
+
+    def __enter__(self) -> "ContextSource":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __str__(self) -> str:
+        return self.text()
+
+class FileSource(ContextSource):
+    """Context read from a file on demand."""
+
+    def __init__(self, path: Union[str, os.PathLike], encoding: str = "utf-8"):
+        super().__init__(encoding=encoding)
+        self.path = os.fspath(path)
+
+    def buffer(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def fingerprint(self) -> Any:
+        stat = os.stat(self.path)
+        return ("file", os.path.abspath(self.path), stat.st_mtime_ns, stat.st_size)
+
+    def _decode(self) -> str:
+        # Decode while reading, so the raw bytes never sit alongside the text
+        with open(self.path, "r", encoding=self.encoding) as f:
+            return f.read()
+
+    def __repr__(self) -> str:
+        return f"FileSource({self.path!r})"
+
+class MmapSource(FileSource):
+    """Context backed by a read-only memory map of a file."""
+
+    def __init__(self, path: Union[str, os.PathLike], encoding: str = "utf-8"):
+        super().__init__(path, encoding=encoding)
+        self._mmap: Optional[mmap.mmap] = None
+
+    def buffer(self) -> Union[bytes, mmap.mmap]:
+        if self._mmap is None:
+            if os.path.getsize(self.path) == 0:
+                # Empty files cannot be mapped
+                return b""
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _decode(self) -> str:
+        # Decode straight from the mapped pages
+        return str(self.buffer(), self.encoding)
+
+    def close(self) -> None:
+        """Release the memory map."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __repr__(self) -> str:
+        return f"MmapSource({self.path!r})"
+
+class BytesSource(ContextSource):
+    """Context held in an in-memory bytes-like buffer."""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview], encoding: str = "utf-8"):
+        super().__init__(encoding=encoding)
+        self.data = data
+
+    def buffer(self) -> memoryview:
+        return memoryview(self.data)
+
+    def fingerprint(self) -> Any:
+        return ("bytes", hashlib.sha256(self.buffer()).hexdigest())
+
+    def __repr__(self) -> str:
+        return f"BytesSource(<{len(self.data)} bytes>)"
+
+def materialize(context: Any) -> Any:
+    """Return the text of a ``ContextSource``; other contexts are returned unchanged."""
+    return context.text() if isinstance(context, ContextSource) else context
@@ -1,4 +1,7 @@
-from dataclasses import dataclass
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 import logging
 logger = logging.getLogger(__name__)
 try:
@@ -7,16 +10,7 @@ try:
 except ImportError:
     tiktoken = None
 
-def count_tokens(text: str, model: str = "gpt-4o") -> int:
-    """
-    Count tokens using tiktoken. 
-    
-    If the provided model is not compatible with tiktoken (e.g., Claude, Llama),
-    it falls back to 'cl100k_base' (GPT-4) encoding to ensure a standard metric.
-    """
-    if not text:
-        return 0
-        
+def _get_encoding(model: str):
     if tiktoken is None:
         raise ImportError(
             "tiktoken is required for accurate metrics. "
@@ -24,14 +18,115 @@ def count_tokens(text: str, model: str = "gpt-4o") -> int:
         )
             
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
         # Fallback for non-OpenAI models to a standard encoding
         logger.debug(f"Model '{model}' not found in tiktoken. Defaulting to cl100k_base.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-        
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count tokens using tiktoken. 
+    
+    If the provided model is not compatible with tiktoken (e.g., Claude, Llama),
+    it falls back to 'cl100k_base' (GPT-4) encoding to ensure a standard metric.
+
+    Inside an active ``TokenCounter`` (e.g. during ``Pipeline.run``), each
+    distinct string is only encoded once.
+    """
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model)
+    counter = _TOKEN_COUNTER.get()
+    if counter is not None:
+        return counter._count(text, encoding)
     return len(encoding.encode(text))
 
+def count_tokens_batch(texts: Sequence[str], model: str = "gpt-4o") -> List[int]:
+    """
+    Count tokens of many texts at once.
+
+    Uses tiktoken's batch encoder, which encodes the texts in parallel, and
+    the active ``TokenCounter`` memo when there is one.
+    """
+    encoding = _get_encoding(model)
+    counter = _TOKEN_COUNTER.get()
+    if counter is not None:
+        return counter._count_batch(texts, encoding)
+    return _encode_lengths(texts, encoding)
+
+def _encode_lengths(texts: Sequence[str], encoding) -> List[int]:
+    counts = [0] * len(texts)
+    todo = [i for i, text in enumerate(texts) if text]
+    if todo:
+        for i, tokens in zip(todo, encoding.encode_batch([texts[i] for i in todo])):
+            counts[i] = len(tokens)
+    return counts
+
+class TokenCounter:
+    """
+    Memo of token counts, shared by everything that counts tokens in a run.
+
+    ``Pipeline.run`` activates a fresh counter for every run, so text that one
+    step counted as its output is not re-encoded when the next step counts it
+    as its input. Counts are keyed by tiktoken encoding, so models sharing an
+    encoding share counts.
+
+    Example
+    -------
+    >>> counter = TokenCounter()
+    >>> with counter.active():
+    ...     count_tokens(code)  # encodes
+    ...     count_tokens(code)  # served from the memo
+    >>> counter.hits, counter.misses
+    (1, 1)
+    """
+
+    def __init__(self):
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, text: str, model: str = "gpt-4o") -> Optional[int]:
+        """Return the count for ``text`` if it was already counted, without encoding it."""
+        if not text:
+            return 0
+        count = self._counts.get((_get_encoding(model).name, text))
+        if count is not None:
+            self.hits += 1
+        return count
+
+    def _count(self, text: str, encoding) -> int:
+        key = (encoding.name, text)
+        count = self._counts.get(key)
+        if count is not None:
+            self.hits += 1
+            return count
+        self.misses += 1
+        count = self._counts[key] = len(encoding.encode(text))
+        return count
+
+    def _count_batch(self, texts: Sequence[str], encoding) -> List[int]:
+        counts = [self._counts.get((encoding.name, text)) if text else 0 for text in texts]
+        missing = list(dict.fromkeys(t for t, c in zip(texts, counts) if c is None))
+        self.hits += sum(1 for text, c in zip(texts, counts) if text and c is not None)
+        self.misses += len(missing)
+        for text, count in zip(missing, _encode_lengths(missing, encoding)):
+            self._counts[(encoding.name, text)] = count
+        return [c if c is not None else self._counts[(encoding.name, t)] for t, c in zip(texts, counts)]
+
+    @contextmanager
+    def active(self) -> Iterator["TokenCounter"]:
+        """Make this counter the one ``count_tokens`` uses in the current context."""
+        token = _TOKEN_COUNTER.set(self)
+        try:
+            yield self
+        finally:
+            _TOKEN_COUNTER.reset(token)
+
+_TOKEN_COUNTER: ContextVar[Optional[TokenCounter]] = ContextVar("scaledown_token_counter", default=None)
+
 @dataclass
 class OptimizerMetrics:
     original_tokens: int
@@ -41,6 +136,7 @@ class OptimizerMetrics:
     latency_ms: float
     retrieval_mode: str
     ast_fidelity: float
+    details: Dict[str, Any] = field(default_factory=dict)
 
 @dataclass
 class CompressorMetrics:
@@ -1,5 +1,7 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
+from .context_source import ContextSource
+from .profile import PipelineProfile
 
 @dataclass
 class StepMetadata:
@@ -17,10 +19,17 @@ class StepMetadata:
 
 @dataclass
 class PipelineResult:
-    """Final output of the pipeline with full history."""
+    """
+    Final output of the pipeline with full history.
+
+    ``original_content`` is the input exactly as passed, so it is a
+    ``ContextSource`` when the run was given one; ``str(original_content)``
+    (or ``materialize``) returns its text.
+    """
     final_content: str
-    original_content: str
+    original_content: Union[str, ContextSource]
     history: List[StepMetadata] = field(default_factory=list)
+    profile: Optional[PipelineProfile] = None
 
     @property
     def original_tokens(self) -> int:
@@ -0,0 +1,78 @@
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional
+
+@dataclass
+class StepProfile:
+    """Resource usage of a single pipeline step."""
+    step_name: str
+    component: str
+    wall_ms: float
+    cpu_ms: float
+    peak_memory_kb: float
+    cprofile_path: Optional[str] = None
+
+@dataclass
+class PipelineProfile:
+    """Per-step resource usage collected by ``Pipeline.run(..., profile=True)``."""
+    steps: List[StepProfile] = field(default_factory=list)
+
+    @property
+    def total_wall_ms(self) -> float:
+        return sum(s.wall_ms for s in self.steps)
+
+    @property
+    def total_cpu_ms(self) -> float:
+        return sum(s.cpu_ms for s in self.steps)
+
+    @property
+    def peak_memory_kb(self) -> float:
+        return max((s.peak_memory_kb for s in self.steps), default=0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"steps": [asdict(s) for s in self.steps]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PipelineProfile":
+        """Rebuild a profile saved with ``to_dict``, e.g. from a previous run's JSON."""
+        return cls(steps=[StepProfile(**s) for s in data.get("steps", [])])
+
+    def to_table(self, baseline: Optional["PipelineProfile"] = None) -> str:
+        """
+        Render the profile as a plain-text table.
+
+        If ``baseline`` is given, each metric is followed by its relative
+        change against the step of the same name in the baseline run.
+        """
+        previous = {s.step_name: s for s in baseline.steps} if baseline else {}
+        rows = [(s.step_name, s.component, s.wall_ms, s.cpu_ms, s.peak_memory_kb, previous.get(s.step_name))
+                for s in self.steps]
+        total_base = None
+        if baseline:
+            total_base = StepProfile("TOTAL", "", baseline.total_wall_ms, baseline.total_cpu_ms, baseline.peak_memory_kb)
+        rows.append(("TOTAL", "", self.total_wall_ms, self.total_cpu_ms, self.peak_memory_kb, total_base))
+
+        def cell(value: float, before: Optional[float]) -> str:
+            text = f"{value:.1f}"
+            if baseline is None:
+                return text
+            if not before:
+                return f"{text} (new)"
+            return f"{text} ({(value - before) / before * 100:+.0f}%)"
+
+        header = ["step", "component", "wall_ms", "cpu_ms", "peak_kb"]
+        lines = [[
+            name,
+            component,
+            cell(wall, base.wall_ms if base else None),
+            cell(cpu, base.cpu_ms if base else None),
+            cell(mem, base.peak_memory_kb if base else None),
+        ] for name, component, wall, cpu, mem, base in rows]
+
+        widths = [max(len(str(row[i])) for row in [header] + lines) for i in range(len(header))]
+        def fmt(row: List[str]) -> str:
+            return "  ".join(str(v).ljust(w) if i < 2 else str(v).rjust(w) for i, (v, w) in enumerate(zip(row, widths)))
+        separator = "  ".join("-" * w for w in widths)
+        return "\n".join([fmt(header), separator] + [fmt(row) for row in lines[:-1]] + [separator, fmt(lines[-1])])
+
+    def __str__(self) -> str:
+        return self.to_table()
@@ -47,3 +47,56 @@ def test_optimization_with_file(temp_python_file):
     assert "def target_function" in result.content
     # Metrics should be populated
     assert result.metrics.original_tokens > 0
+
+def test_optimization_with_file_source(temp_python_file):
+    opt = HasteOptimizer(top_k=2, semantic=False)
+    source = sd.FileSource(temp_python_file)
+    result = opt.optimize(context=source, query="target_function")
+
+    assert "def target_function" in result.content
+    assert result.metrics.original_tokens > 0
+    # Read by path, never decoded into a string
+    assert source._text is None
+
+def test_string_context_uses_scratch_dir(tmp_path, monkeypatch):
+    from scaledown.optimizer import haste
+    from scaledown.types.metrics import count_tokens
+
+    monkeypatch.setattr(haste, "_SHM_DIR", str(tmp_path))
+    opt = HasteOptimizer(top_k=2, semantic=False)
+    result = opt.optimize(context=TEST_CODE, query="target_function")
+
+    assert "def target_function" in result.content
+    # Counted from the string, and the scratch copy is gone
+    assert result.metrics.original_tokens == count_tokens(TEST_CODE, model=opt.target_model)
+    assert list(tmp_path.iterdir()) == []
+
+def test_parse_and_result_caches(temp_python_file):
+    from unittest.mock import patch
+    from haste import select_from_file
+    from scaledown.optimizer import haste
+
+    opt = HasteOptimizer(top_k=2, semantic=False)
+    expected = select_from_file(temp_python_file, "dependency", top_k=2)["code"]
+    first = opt.optimize(context="", query="dependency", file_path=temp_python_file)
+    assert first.content == expected
+    assert first.metrics.details["result_cache_hit"] is False
+
+    with patch.object(haste, "index_python_file", wraps=haste.index_python_file) as index:
+        # Same search terms: served from the result cache
+        again = opt.optimize(context="", query="  Dependency ", file_path=temp_python_file)
+        assert again.metrics.details["result_cache_hit"] is True
+        assert again.content == first.content
+        # New query on the same file: parsed structures are reused
+        other = opt.optimize(context="", query="target_function", file_path=temp_python_file)
+        assert "def target_function" in other.content
+        assert other.content == select_from_file(temp_python_file, "target_function", top_k=2)["code"]
+        assert index.call_count == 0
+
+        # Edited file: new content hash, parsed again
+        with open(temp_python_file, "a", encoding="utf-8") as f:
+            f.write("\ndef extra():\n    return target_function(1)\n")
+        edited = opt.optimize(context="", query="extra", file_path=temp_python_file)
+        assert "def extra" in edited.content
+        assert edited.content == select_from_file(temp_python_file, "extra", top_k=2)["code"]
+        assert index.call_count == 1
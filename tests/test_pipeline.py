@@ -1,8 +1,10 @@
 import pytest
 import tempfile
 import os
+import time
 from unittest.mock import patch, MagicMock
 import scaledown as sd
+from scaledown.compressor.base import BaseCompressor
 
 try:
     from scaledown.optimizer import HasteOptimizer, SemanticOptimizer
@@ -93,3 +95,645 @@ def test_multi_step_pipeline(mock_post, complex_pipeline, temp_python_file):
     assert result.history[2].step_name == "compressor"
     
     # Verify semantic step received input from haste (implicit check via flow) and passed output to compressor
+
+
+def test_stream_preserves_order_and_history():
+    pipe = sd.Pipeline([
+        ("upper", lambda text, **kwargs: text.upper()),
+        ("strip", lambda text, **kwargs: text.strip()),
+    ])
+
+    results = list(pipe.stream((f" doc {i} " for i in range(20)), buffer_size=2))
+
+    assert [r.final_content for r in results] == [f"DOC {i}" for i in range(20)]
+    assert all(isinstance(r, sd.PipelineResult) for r in results)
+    assert [step.step_name for step in results[0].history] == ["upper", "strip"]
+    assert results[3].original_content == " doc 3 "
+
+
+def test_stream_applies_backpressure():
+    produced = []
+
+    def documents():
+        for i in range(100):
+            produced.append(i)
+            yield f"doc {i}"
+
+    pipe = sd.Pipeline([
+        ("first", lambda text, **kwargs: text),
+        ("second", lambda text, **kwargs: text),
+    ])
+
+    stream = pipe.stream(documents(), buffer_size=1)
+    first = next(stream)
+    time.sleep(0.2)
+
+    assert first.final_content == "doc 0"
+    # One item per queue plus one in flight per stage; far fewer than the corpus
+    assert len(produced) <= 8
+    stream.close()
+
+
+def test_stream_raises_step_errors_in_order():
+    def explode(text, **kwargs):
+        if text == "bad":
+            raise ValueError("boom")
+        return text
+
+    pipe = sd.Pipeline([("explode", explode)])
+    stream = pipe.stream(["ok", "bad", "never"])
+
+    assert next(stream).final_content == "ok"
+    with pytest.raises(ValueError, match="boom"):
+        next(stream)
+
+
+def test_memory_serves_unchanged_prefix(tmp_path):
+    calls = []
+
+    class Suffix:
+        def __init__(self, suffix):
+            self.suffix = suffix
+
+        def __call__(self, text, **kwargs):
+            calls.append(self.suffix)
+            return text + self.suffix
+
+    first = sd.Pipeline([("a", Suffix("-a")), ("b", Suffix("-b"))], memory=str(tmp_path))
+    first.run("doc", query="q")
+    assert calls == ["-a", "-b"]
+
+    # Only the last step's configuration changed
+    second = sd.Pipeline([("a", Suffix("-a")), ("b", Suffix("-c"))], memory=str(tmp_path))
+    result = second.run("doc", query="q")
+
+    assert calls == ["-a", "-b", "-c"]
+    assert result.final_content == "doc-a-c"
+    assert result.history[0].details["cached"] is True
+    assert "cached" not in result.history[1].details
+
+    # Different run arguments are a different input
+    second.run("doc", query="other")
+    assert calls[-2:] == ["-a", "-c"]
+
+
+class _StaticOptimizer(sd.optimizer.BaseOptimizer):
+    """Optimizer returning fixed content after an optional delay."""
+
+    def __init__(self, content, delay=0.0):
+        super().__init__()
+        self.content = content
+        self.delay = delay
+
+    def optimize(self, context, query=None, max_tokens=None, **kwargs):
+        time.sleep(self.delay)
+        return sd.OptimizedContext(
+            content=self.content,
+            metrics=sd.types.metrics.OptimizerMetrics(
+                original_tokens=100, optimized_tokens=10, chunks_retrieved=1,
+                compression_ratio=10.0, latency_ms=self.delay * 1000,
+                retrieval_mode="static", ast_fidelity=1.0
+            )
+        )
+
+
+CLASS_BLOCK = "class Store:\n    def get(self):\n        return 1"
+METHOD_BLOCK = "    def get(self):\n        return 1"
+
+
+def test_union_dedupes_and_records_branches():
+    union = sd.OptimizerUnion([
+        ("first", _StaticOptimizer("def a():\n    pass\n\n" + CLASS_BLOCK, delay=0.2)),
+        ("second", _StaticOptimizer("def a():\n    pass\n\n# ... [Semantic Context Search Result] ...\n\ndef b():\n    pass", delay=0.2)),
+    ])
+    pipe = sd.Pipeline([("union", union)])
+
+    start = time.time()
+    result = pipe.run("ignored", query="q")
+    elapsed = time.time() - start
+
+    assert result.final_content == "def a():\n    pass\n\n" + CLASS_BLOCK + "\n\ndef b():\n    pass"
+    # Branches run concurrently
+    assert elapsed < 0.35
+    branches = result.history[0].details["branches"]
+    assert [b.step_name for b in branches] == ["first", "second"]
+    assert branches[0].details["component"] == "_StaticOptimizer"
+
+
+def test_union_dedupe_collapses_contained_blocks():
+    union = sd.OptimizerUnion([
+        ("methods", _StaticOptimizer(METHOD_BLOCK)),
+        ("classes", _StaticOptimizer(CLASS_BLOCK)),
+    ])
+
+    result = union.optimize("ignored", query="q")
+
+    assert result.content == CLASS_BLOCK
+    assert result.metrics.retrieval_mode == "union_dedupe"
+
+
+def test_union_interleave_respects_budget():
+    union = sd.OptimizerUnion([
+        ("a", _StaticOptimizer("def a1():\n    pass\n\ndef a2():\n    pass")),
+        ("b", _StaticOptimizer("def b1():\n    pass\n\ndef b2():\n    pass")),
+    ], merge="interleave")
+
+    full = union.optimize("ignored", query="q")
+    assert full.content.split("\n\n") == [
+        "def a1():\n    pass", "def b1():\n    pass", "def a2():\n    pass", "def b2():\n    pass"
+    ]
+
+    budget = sd.types.metrics.count_tokens("def a1():\n    pass\n\ndef b1():\n    pass")
+    limited = union.optimize("ignored", query="q", max_tokens=budget)
+    assert limited.content == "def a1():\n    pass\n\ndef b1():\n    pass"
+
+
+def test_union_rejects_unknown_merge():
+    with pytest.raises(ValueError):
+        sd.OptimizerUnion([("a", _StaticOptimizer("x"))], merge="concat")
+
+
+def test_budget_skips_steps_once_within_budget():
+    calls = []
+
+    def shorten(text, **kwargs):
+        calls.append("shorten")
+        return text.split()[0]
+
+    def expensive(text, **kwargs):
+        calls.append("expensive")
+        return text
+
+    pipe = sd.Pipeline([("shorten", shorten), ("expensive", expensive)], max_tokens=5)
+
+    result = pipe.run("alpha beta gamma delta epsilon zeta eta theta")
+    assert calls == ["shorten"]
+    assert result.final_content == "alpha"
+    assert result.history[1].details["skipped"] is True
+    assert result.history[1].details["reason"] == "within_budget"
+    assert result.history[1].input_tokens == result.history[0].output_tokens
+
+    short = pipe.run("tiny")
+    assert calls == ["shorten"]
+    assert short.final_content == "tiny"
+    assert all(step.details.get("skipped") for step in short.history)
+
+
+def test_budget_does_not_skip_file_path_runs(temp_python_file):
+    def read_file(text, file_path=None, **kwargs):
+        with open(file_path, encoding="utf-8") as f:
+            return f.read()
+
+    pipe = sd.Pipeline([("read", read_file)], max_tokens=100)
+
+    # The empty context is not the input: the step reads it from file_path
+    result = pipe.run("", file_path=temp_python_file, query="database")
+    assert result.final_content == TEST_CODE
+    assert "skipped" not in result.history[0].details
+
+
+class _RecordingCallback(sd.PipelineCallback):
+    def __init__(self):
+        self.events = []
+
+    def on_run_start(self, pipeline, context):
+        self.events.append(("run_start",))
+
+    def on_run_end(self, pipeline, result):
+        self.events.append(("run_end", result.final_content))
+
+    def on_step_start(self, step_name, component):
+        self.events.append(("step_start", step_name))
+
+    def on_step_end(self, step_name, component, metadata):
+        self.events.append(("step_end", step_name, metadata.output_tokens))
+
+    def on_step_error(self, step_name, component, error):
+        self.events.append(("step_error", step_name, str(error)))
+
+
+def test_callbacks_receive_step_events():
+    recorder = _RecordingCallback()
+    pipe = sd.Pipeline([("upper", lambda text, **kwargs: text.upper())], callbacks=[recorder])
+
+    result = pipe.run("hello world")
+
+    assert recorder.events == [
+        ("run_start",),
+        ("step_start", "upper"),
+        ("step_end", "upper", 2),
+        ("run_end", "HELLO WORLD"),
+    ]
+    assert result.history[0].details["wall_ms"] >= 0
+
+
+def test_callbacks_see_step_errors_and_never_break_runs():
+    class Broken(sd.PipelineCallback):
+        def on_step_start(self, step_name, component):
+            raise RuntimeError("callback bug")
+
+    def explode(text, **kwargs):
+        raise ValueError("boom")
+
+    recorder = _RecordingCallback()
+    assert sd.Pipeline([("noop", lambda text, **kwargs: text)], callbacks=[Broken()]).run("x").final_content == "x"
+
+    with pytest.raises(ValueError):
+        sd.Pipeline([("explode", explode)], callbacks=[recorder]).run("x")
+    assert ("step_error", "explode", "boom") in recorder.events
+
+
+def test_opentelemetry_callback_nests_step_spans():
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    tracer = provider.get_tracer("test")
+
+    def call_service(text, **kwargs):
+        # Stands in for an instrumented library call made inside a step
+        with tracer.start_as_current_span("http.request"):
+            return text.upper()
+
+    pipe = sd.Pipeline([("upper", call_service)], callbacks=[sd.OpenTelemetryCallback(tracer=tracer)])
+    pipe.run("hello world")
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    step, run = spans["scaledown.step.upper"], spans["scaledown.pipeline.run"]
+    assert step.parent.span_id == run.context.span_id
+    assert spans["http.request"].parent.span_id == step.context.span_id
+    assert step.attributes["scaledown.output_tokens"] == 2
+    from opentelemetry import trace
+    assert not trace.get_current_span().get_span_context().is_valid
+
+
+def test_profile_attaches_per_step_usage(tmp_path):
+    def allocate(text, **kwargs):
+        blob = [text] * 200_000
+        return text + str(len(blob))
+
+    pipe = sd.Pipeline([("allocate", allocate), ("noop", lambda text, **kwargs: text)])
+
+    plain = pipe.run("doc")
+    assert plain.profile is None
+
+    result = pipe.run("doc", profile=True, cprofile_dir=str(tmp_path))
+    steps = result.profile.steps
+    assert [s.step_name for s in steps] == ["allocate", "noop"]
+    assert steps[0].peak_memory_kb > 1000
+    assert steps[0].wall_ms >= 0 and steps[0].cpu_ms >= 0
+    assert os.path.exists(steps[0].cprofile_path)
+
+    table = result.profile.to_table(baseline=result.profile)
+    assert "allocate" in table and "TOTAL" in table and "(+0%)" in table
+
+
+def _sleepy(seconds):
+    def step(text, **kwargs):
+        time.sleep(seconds)
+        return text + "-slow"
+    return step
+
+
+def test_step_timeout_passes_input_through():
+    pipe = sd.Pipeline(
+        [("slow", _sleepy(1.0)), ("upper", lambda text, **kwargs: text.upper())],
+        step_timeouts={"slow": 0.05}
+    )
+
+    start = time.time()
+    result = pipe.run("doc")
+
+    assert time.time() - start < 0.5
+    assert result.final_content == "DOC"
+    assert result.history[0].details["timed_out"] is True
+    assert result.history[0].details["fallback"] == "passthrough"
+
+
+def test_timeout_uses_fallback_step_or_raises():
+    with_fallback = sd.Pipeline(
+        [("slow", _sleepy(1.0))],
+        step_timeouts={"slow": 0.05},
+        fallbacks={"slow": lambda text, **kwargs: text + "-cheap"}
+    )
+    result = with_fallback.run("doc")
+    assert result.final_content == "doc-cheap"
+    assert result.history[0].details["timed_out"] is True
+
+    strict = sd.Pipeline([("slow", _sleepy(1.0))], timeout=0.05, on_timeout="raise")
+    with pytest.raises(sd.exceptions.PipelineError):
+        strict.run("doc")
+
+
+def test_deadline_is_propagated_to_steps():
+    from scaledown.deadline import remaining_time
+
+    seen = []
+
+    def record(text, **kwargs):
+        seen.append(remaining_time())
+        return text
+
+    sd.Pipeline([("record", record)], timeout=5.0).run("doc")
+    sd.Pipeline([("record", record)]).run("doc")
+
+    assert 0 < seen[0] <= 5.0
+    assert seen[1] is None
+
+
+def test_stream_timeout_excludes_time_waiting_in_buffers():
+    pipe = sd.Pipeline([("slow", _sleepy(0.1))], timeout=0.5)
+    results = list(pipe.stream((f"doc{i}" for i in range(10)), buffer_size=8))
+    assert [r.final_content for r in results] == [f"doc{i}-slow" for i in range(10)]
+    assert not any(r.history[0].details.get("timed_out") for r in results)
+
+
+def test_abandoned_steps_are_capped(monkeypatch):
+    import threading
+    import scaledown.pipeline as pipeline_module
+
+    release, started = threading.Event(), []
+
+    def stuck(text, **kwargs):
+        started.append(text)
+        release.wait(5)
+        return text + "-done"
+
+    monkeypatch.setattr(pipeline_module, "_MAX_ABANDONED_STEPS", 2)
+    pipe = sd.Pipeline([("stuck", stuck)], step_timeouts={"stuck": 0.02})
+    try:
+        results = [pipe.run(f"doc{i}") for i in range(4)]
+        # Once two overrunning steps are in flight, no further threads are started
+        assert started == ["doc0", "doc1"]
+        assert all(r.history[0].details["timed_out"] for r in results)
+    finally:
+        release.set()
+
+    # Finished overruns free their slots
+    give_up = time.time() + 2
+    while pipe._abandoned and time.time() < give_up:
+        time.sleep(0.01)
+    assert pipe.run("again").final_content == "again-done"
+
+
+def test_cprofile_covers_steps_run_under_a_timeout(tmp_path):
+    import pstats
+
+    def busy_work(text, **kwargs):
+        return text + str(sum(range(10_000)))
+
+    result = sd.Pipeline([("busy", busy_work)], timeout=30).run("doc", cprofile_dir=str(tmp_path))
+    stats = pstats.Stats(result.profile.steps[0].cprofile_path)
+    assert any(function == "busy_work" for _, _, function in stats.stats)
+
+
+@patch("requests.post")
+def test_compressor_request_timeout_follows_deadline(mock_post):
+    from scaledown.deadline import deadline
+
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"results": {"compressed_prompt": "c"}}
+    mock_post.return_value = mock_response
+    compressor = sd.ScaleDownCompressor(api_key="test_key", timeout=30)
+
+    compressor.compress("context", "prompt")
+    assert mock_post.call_args.kwargs["timeout"] == 30
+
+    with deadline(2.0):
+        compressor.compress("context", "prompt")
+    assert 0 < mock_post.call_args.kwargs["timeout"] <= 2.0
+
+
+class _CountingEncoding:
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split()
+
+
+def test_each_distinct_string_is_tokenized_once_per_run():
+    encoding = _CountingEncoding()
+
+    class Recorder(sd.optimizer.BaseOptimizer):
+        def optimize(self, context, query=None, max_tokens=None, **kwargs):
+            assert "input_tokens" not in kwargs
+            tokens = sd.types.metrics.count_tokens(context)
+            return sd.OptimizedContext(
+                content=context,
+                metrics=sd.types.metrics.OptimizerMetrics(
+                    original_tokens=tokens, optimized_tokens=tokens, chunks_retrieved=1,
+                    compression_ratio=1.0, latency_ms=0.0, retrieval_mode="mock", ast_fidelity=1.0
+                )
+            )
+
+    pipe = sd.Pipeline([
+        ("first", lambda text, **kwargs: text.strip()),
+        ("second", lambda text, **kwargs: text),
+        ("recorder", Recorder()),
+    ])
+
+    with patch("scaledown.types.metrics._get_encoding", return_value=encoding):
+        pipe.run("  one two three  ")
+        # Distinct strings: the raw input and the stripped text; the recorder's count is a memo hit
+        assert encoding.calls == 2
+
+        # Counts do not leak between runs
+        pipe.run("  one two three  ")
+        assert encoding.calls == 4
+
+
+def test_compressors_with_the_documented_signature_run_after_other_steps():
+    class Upper(BaseCompressor):
+        def compress(self, context, prompt, max_tokens=None):
+            tokens = sd.types.metrics.count_tokens(context)
+            return sd.CompressedPrompt(
+                content=context.upper(), original_prompt=prompt,
+                tokens=(tokens, tokens), latency=0.0, model="mock"
+            )
+
+    class Counted(_StaticOptimizer):
+        def optimize(self, context, query=None, max_tokens=None, **kwargs):
+            # Leaves the output's count in the run's memo, as real optimizers do
+            sd.types.metrics.count_tokens(self.content)
+            return super().optimize(context, query, max_tokens, **kwargs)
+
+    pipe = sd.Pipeline([("o", Counted("def f():\n    pass")), ("c", Upper(rate="auto", api_key="key"))])
+    result = pipe.run("def f():\n    pass\n\ndef g():\n    pass", prompt="Explain")
+    assert result.final_content == "DEF F():\n    PASS"
+
+
+def test_context_sources_are_materialized_only_for_text_steps(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("def handler():\n    return 1\n", encoding="utf-8")
+    seen = []
+
+    class PathReader(sd.optimizer.BaseOptimizer):
+        supports_context_sources = True
+
+        def optimize(self, context, query=None, max_tokens=None, **kwargs):
+            seen.append(context)
+            with open(context.path, encoding="utf-8") as f:
+                code = f.read()
+            return sd.OptimizedContext(
+                content=code.strip(),
+                metrics=sd.types.metrics.OptimizerMetrics(
+                    original_tokens=10, optimized_tokens=8, chunks_retrieved=1,
+                    compression_ratio=1.25, latency_ms=0.0, retrieval_mode="mock", ast_fidelity=1.0
+                )
+            )
+
+    source = sd.MmapSource(path)
+    result = sd.Pipeline([
+        ("reader", PathReader()),
+        ("text", lambda text, **kwargs: text.upper()),
+    ]).run(source)
+
+    assert seen == [source]
+    assert source._text is None  # never decoded
+    assert result.final_content == "DEF HANDLER():\n    RETURN 1"
+    assert result.original_content is source
+
+    passthrough = sd.Pipeline([("noop", lambda text, **kwargs: text)]).run(sd.BytesSource(b"raw bytes"))
+    assert passthrough.final_content == "raw bytes"
+
+
+def test_pipeline_closes_memory_mapped_sources(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("def handler():\n    return 1\n", encoding="utf-8")
+    upper = sd.Pipeline([("upper", lambda text, **kwargs: text.upper())])
+
+    source = sd.MmapSource(path)
+    source.buffer()
+    result = upper.run(source)
+    assert source._mmap is None
+    # The source stays readable after the run
+    assert str(result.original_content) == "def handler():\n    return 1\n"
+
+    streamed = sd.MmapSource(path)
+    assert [r.final_content for r in upper.stream([streamed])] == ["DEF HANDLER():\n    RETURN 1\n"]
+    assert streamed._mmap is None
+
+    with sd.MmapSource(path) as mapped:
+        mapped.buffer()
+    assert mapped._mmap is None
+
+
+
+def test_union_materializes_sources_for_text_branches(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("def handler():\n    return 1\n", encoding="utf-8")
+    received = {}
+
+    class TextBranch(_StaticOptimizer):
+        def optimize(self, context, query=None, max_tokens=None, **kwargs):
+            received["text"] = context
+            self.content = context.upper()
+            return super().optimize(context, query, max_tokens, **kwargs)
+
+    class SourceBranch(_StaticOptimizer):
+        supports_context_sources = True
+
+        def optimize(self, context, query=None, max_tokens=None, **kwargs):
+            received["source"] = context
+            return super().optimize(context, query, max_tokens, **kwargs)
+
+    union = sd.OptimizerUnion([("text", TextBranch("")), ("source", SourceBranch("def other():\n    pass"))])
+    result = sd.Pipeline([("u", union)]).run(sd.FileSource(path))
+
+    assert received["text"] == "def handler():\n    return 1\n"
+    assert isinstance(received["source"], sd.FileSource)
+    assert "DEF HANDLER():" in result.final_content
+
+
+def test_step_cache_keys_sources_without_reading(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("hello", encoding="utf-8")
+    cache = sd.StepCache(str(tmp_path / "cache"))
+    step = lambda text, **kwargs: text
+
+    first = cache.key(step, sd.FileSource(path), {})
+    assert cache.key(step, sd.FileSource(path), {}) == first
+    path.write_text("hello, world", encoding="utf-8")
+    assert cache.key(step, sd.FileSource(path), {}) != first
+
+
+def test_step_cache_keys_follow_nested_config(tmp_path):
+    cache = sd.StepCache(str(tmp_path / "cache"))
+
+    def union(content):
+        return sd.OptimizerUnion([("a", _StaticOptimizer("x")), ("b", _StaticOptimizer(content))])
+
+    # Fresh but identical configurations share a key, as they would across processes
+    first = cache.key(union("y"), "doc", {})
+    assert cache.key(union("y"), "doc", {}) == first
+    # A change inside a branch invalidates the union's entry
+    assert cache.key(union("z"), "doc", {}) != first
+
+
+@pytest.mark.skipif(not DEPS_AVAILABLE, reason="Optimizers not installed")
+def test_step_cache_key_is_stable_across_calls(tmp_path, temp_python_file):
+    pytest.importorskip("faiss")
+    cache = sd.StepCache(str(tmp_path / "cache"))
+    opt = SemanticOptimizer(top_k=1, encoder="hashing")
+    kwargs = {"query": "database", "file_path": temp_python_file}
+
+    before = cache.key(opt, "", kwargs)
+    opt.optimize("", **kwargs)
+    # The shared query-embedding cache changed, but the configuration did not
+    assert cache.key(opt, "", kwargs) == before
+    assert cache.key(SemanticOptimizer(top_k=1, encoder="hashing"), "", kwargs) == before
+    # Different embedding models never share an entry
+    assert cache.key(SemanticOptimizer(model_name="A"), "", kwargs) != cache.key(SemanticOptimizer(model_name="B"), "", kwargs)
+
+
+def test_step_cache_keys_follow_callable_bindings(tmp_path):
+    import functools
+
+    def truncate_to(n):
+        return lambda text, **kwargs: text[:n]
+
+    def trunc(text, n=3, **kwargs):
+        return text[:n]
+
+    def pipe(step):
+        return sd.Pipeline([("t", step)], memory=str(tmp_path / "cache"))
+
+    # Closures, partials and defaults over different values never share an entry
+    assert pipe(truncate_to(3)).run("abcdefgh").final_content == "abc"
+    result = pipe(truncate_to(6)).run("abcdefgh")
+    assert result.final_content == "abcdef" and "cached" not in result.history[0].details
+    assert pipe(functools.partial(trunc, n=3)).run("abcdefgh").final_content == "abc"
+    assert pipe(functools.partial(trunc, n=6)).run("abcdefgh").final_content == "abcdef"
+    trunc.__defaults__ = (2,)
+    assert pipe(trunc).run("abcdefgh").final_content == "ab"
+    assert pipe(trunc).run("abcdefgh").history[0].details["cached"] is True
+
+    cache = sd.StepCache(str(tmp_path / "keys"))
+    assert cache.key(lambda text: text.upper(), "x", {}) != cache.key(lambda text: text.lower(), "x", {})
+
+    # A closure over a variable that is not bound yet cannot be described, so it is not cached
+    def unbound_step(text, **kwargs):
+        return later(text)
+    assert cache.key(unbound_step, "x", {}) is None
+    later = str.upper
+
+
+def test_union_dedupe_matches_whole_lines():
+    union = sd.OptimizerUnion([
+        ("a", _StaticOptimizer("def limit():\n    return 100")),
+        ("b", _StaticOptimizer("def limit():\n    return 10\n\n" + METHOD_BLOCK.strip())),
+    ])
+
+    result = union.optimize("ignored", query="q")
+
+    # A prefix of another block's text is still a distinct block; a re-indented copy is not
+    assert result.content.split("\n\n") == ["def limit():\n    return 100", "def limit():\n    return 10", METHOD_BLOCK.strip()]
+    assert union._add_block([CLASS_BLOCK], METHOD_BLOCK.strip()) is False
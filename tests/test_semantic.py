@@ -41,6 +41,14 @@ def temp_python_file():
     if os.path.exists(temp_path):
         os.unlink(temp_path)
 
+@pytest.fixture(autouse=True)
+def clear_query_cache():
+    # Mocked models share a model name across tests, so their query vectors must not leak
+    if SEMANTIC_DEPS_AVAILABLE:
+        from scaledown.optimizer import query_embedding_cache
+        query_embedding_cache.clear()
+    yield
+
 @pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
 def test_initialization():
     opt = SemanticOptimizer(top_k=5)
@@ -73,6 +81,117 @@ def test_semantic_search_flow(temp_python_file):
         assert "def process_batch" in result.content or "def load_data" in result.content
         assert result.metrics.retrieval_mode == "semantic_search"
 
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_optimize_many_embeds_once(temp_python_file):
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        mock_instance = MockModel.return_value
+        mock_instance.encode.side_effect = lambda texts: np.array(
+            [[float("load" in t), float("batch" in t)] for t in texts], dtype=np.float32
+        )
+        opt = SemanticOptimizer(top_k=1)
+
+        results = opt.optimize_many(["load", "batch", None], file_path=temp_python_file)
+
+        # One call for the chunks and one for all three queries
+        assert mock_instance.encode.call_count == 2
+        assert len(results) == 3
+        assert "def load_data" in results[0].content
+        assert "def process_batch" in results[1].content
+        assert all(r.metrics.details["batch_size"] == 3 for r in results)
+        assert opt.optimize_many([], file_path=temp_python_file) == []
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_query_embeddings_are_cached_across_instances(temp_python_file):
+    from scaledown.optimizer import QueryEmbeddingCache, query_embedding_cache
+
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        encode = MockModel.return_value.encode
+        encode.side_effect = lambda texts: np.array(
+            [[float("load" in t), float("batch" in t)] for t in texts], dtype=np.float32
+        )
+        first = SemanticOptimizer(top_k=1).optimize(context="", file_path=temp_python_file, query="load  data")
+        encode.reset_mock()
+        second = SemanticOptimizer(top_k=1).optimize(context="", file_path=temp_python_file, query=" load data")
+
+        # Only the chunks are embedded again; the normalized query comes from the shared cache
+        encode.assert_called_once()
+        assert "def load_data" in second.content
+        assert first.metrics.details["query_cache_misses"] == 1
+        assert second.metrics.details["query_cache_hits"] == 1
+        assert query_embedding_cache.hit_rate == 0.5
+
+        encode.reset_mock()
+        SemanticOptimizer(top_k=1, query_cache=False).optimize(context="", file_path=temp_python_file, query="load data")
+        assert encode.call_count == 2
+
+    cache = QueryEmbeddingCache(maxsize=2)
+    fn = MagicMock(side_effect=lambda texts: np.ones((len(texts), 2), dtype=np.float32))
+    cache.encode("m", ["a", "b", "a"], fn)
+    fn.assert_called_once_with(["a", "b"])
+    cache.encode("m", ["c"], fn)
+    assert len(cache) == 2
+    cache.encode("other", ["c"], fn)
+    assert fn.call_count == 3
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_max_tokens_packs_chunks_within_budget(temp_python_file):
+    from scaledown.types.metrics import count_tokens, count_tokens_batch
+
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.side_effect = lambda texts: np.array(
+            [[float("batch" in t), 1.0] for t in texts], dtype=np.float32
+        )
+        opt = SemanticOptimizer(top_k=2)
+
+        unbounded = opt.optimize(context="", file_path=temp_python_file, query="batch")
+        assert unbounded.metrics.chunks_retrieved == 2
+
+        budget = count_tokens("def helper_function():\n    pass") + 1
+        tight = opt.optimize(context="", file_path=temp_python_file, query="batch", max_tokens=budget)
+        assert 0 < tight.metrics.optimized_tokens <= budget
+        assert tight.metrics.details["max_tokens"] == budget
+
+        # A roomy budget packs beyond top_k: the class plus the function outside it
+        roomy = opt.optimize(context="", file_path=temp_python_file, query="batch", max_tokens=10_000)
+        assert "class DataProcessor" in roomy.content and "def helper_function" in roomy.content
+
+    texts = ["def f():\n    return 1", "", "class A:\n    pass"]
+    assert count_tokens_batch(texts) == [count_tokens(t) for t in texts]
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_nested_hits_are_collapsed(temp_python_file):
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.side_effect = lambda texts: np.array(
+            [[float("batch" in t), 1.0] for t in texts], dtype=np.float32
+        )
+        opt = SemanticOptimizer(top_k=2)
+        result = opt.optimize(context="", file_path=temp_python_file, query="batch")
+
+    # process_batch is inside DataProcessor, so its slot goes to the next best chunk
+    assert result.content.count("def process_batch") == 1
+    assert result.metrics.chunks_retrieved == 2
+    assert result.content.index("class DataProcessor") < result.content.index("def helper_function")
+    assert result.metrics.details["overlapping_chunks_removed"] == 1
+    assert result.metrics.details["duplicate_tokens_removed"] > 0
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_hybrid_retrieval_embeds_only_the_shortlist(temp_python_file):
+    from scaledown.optimizer.lexical import identifier_tokens
+
+    assert identifier_tokens("parseHTTPResponse(user_id)") == [
+        "parse", "http", "response", "parsehttpresponse", "user", "id", "userid"
+    ]
+
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.side_effect = lambda texts: np.ones((len(texts), 2), dtype=np.float32)
+        opt = SemanticOptimizer(top_k=1, retrieval="hybrid")
+        result = opt.optimize(context="", file_path=temp_python_file, query="loadData")
+
+    assert result.metrics.retrieval_mode == "semantic_hybrid"
+    # Only the class, __init__ and load_data match "load"/"data"; the lexical rank breaks the embedding tie
+    assert result.metrics.details["chunks_embedded"] == 3
+    assert result.content.startswith("def load_data")
+
 @pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
 def test_fallback_on_model_failure(temp_python_file):
     """Test that optimizer falls back gracefully if model fails to load (e.g., Error 54)."""
@@ -91,6 +210,24 @@ def test_fallback_on_model_failure(temp_python_file):
         assert result.metrics.retrieval_mode == "fallback_model_load_failed"
         assert result.metrics.original_tokens > 0
 
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_in_memory_context_without_file_path():
+    other = "def parse_config(path):\n    return open(path).read()\n"
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.side_effect = lambda texts: np.array(
+            [[float("config" in t), 1.0] for t in texts], dtype=np.float32
+        )
+        opt = SemanticOptimizer(top_k=1)
+
+        result = opt.optimize(context=TEST_CODE, query="batch")
+        assert result.metrics.retrieval_mode == "semantic_search"
+        assert result.metrics.chunks_retrieved == 1
+
+        # A list is several documents; the first one is served from the parse cache
+        result = opt.optimize(context=[TEST_CODE, other], query="config")
+        assert result.content == other.rstrip("\n")
+        assert len(opt._parse_cache) == 2
+
 def test_missing_file_path():
     """Test behavior when file_path is missing."""
     if not SEMANTIC_DEPS_AVAILABLE:
@@ -101,3 +238,325 @@ def test_missing_file_path():
     
     assert result.content == "some context"
     assert result.metrics.retrieval_mode.startswith("fallback")
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_extract_semantic_units_decorators_and_async():
+    from scaledown.optimizer.semantic_code import extract_semantic_units
+
+    source = (
+        "class Client:\n"
+        "    @property\n"
+        "    def name(self):  # \u00e9\n"
+        "        return '\u00fc'\n"
+        "\n"
+        "    @ staticmethod\n"
+        "    async def fetch(url):\n"
+        "        return await get(url)\n"
+    )
+    units = {u["name"]: u for u in extract_semantic_units(source, "client.py")}
+
+    assert units["name"]["code"] == "@property\n    def name(self):  # \u00e9\n        return '\u00fc'"
+    assert units["fetch"]["type"] == "function"
+    assert units["fetch"]["code"].startswith("@ staticmethod\n    async def fetch(url):")
+    assert (units["fetch"]["metadata"]["lineno"], units["fetch"]["metadata"]["end_lineno"]) == (6, 8)
+    assert units["Client"]["code"] == source.rstrip("\n")
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_embedding_cache_only_embeds_changed_chunks(temp_python_file, tmp_path):
+    encoded = []
+
+    def mock_encode(texts):
+        encoded.extend(texts)
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.side_effect = mock_encode
+        opt = SemanticOptimizer(top_k=1, embedding_cache=str(tmp_path / "emb"))
+
+        first = opt.optimize(context="", file_path=temp_python_file, query="process data")
+        chunks_embedded = len(encoded) - 1  # minus the query
+        assert first.metrics.details["embedding_cache_hit_ratio"] == 0.0
+
+        second = opt.optimize(context="", file_path=temp_python_file, query="load data")
+        assert len(encoded) == chunks_embedded + 2  # only the two queries
+        assert second.metrics.details["embedding_cache_hit_ratio"] == 1.0
+
+        with open(temp_python_file, "a", encoding="utf-8") as f:
+            f.write("\ndef new_function():\n    return 42\n")
+        third = opt.optimize(context="", file_path=temp_python_file, query="new")
+        assert "def new_function():\n    return 42" in encoded
+        assert third.metrics.details["embedding_cache_misses"] == 1
+
+    # The cache persists across instances
+    from scaledown.optimizer import EmbeddingCache
+    reopened = EmbeddingCache(str(tmp_path / "emb"))
+    _, stats = reopened.encode(opt.model_name, ["def helper_function():\n    pass"], mock_encode)
+    assert stats == {"hits": 1, "misses": 0}
+
+def test_embedding_cache_instances_share_a_directory(tmp_path):
+    from scaledown.optimizer import EmbeddingCache
+    from scaledown.optimizer.embedding_cache import _ModelStore, content_hash
+
+    def encode(texts):
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    first, second = EmbeddingCache(str(tmp_path)), EmbeddingCache(str(tmp_path))
+    first.encode("m", ["a"], encode)
+    vectors, stats = second.encode("m", ["a", "bb"], encode)
+    assert stats == {"hits": 1, "misses": 1}
+    np.testing.assert_array_equal(vectors, encode(["a", "bb"]))
+
+    # A writer in another process appends after our rows and we pick up its index
+    other = _ModelStore(str(tmp_path / "m"))
+    other.add([content_hash("ccc")], encode(["ccc"]))
+    vectors, stats = first.encode("m", ["a", "bb", "ccc"], encode)
+    assert stats == {"hits": 3, "misses": 0}
+    np.testing.assert_array_equal(vectors, encode(["a", "bb", "ccc"]))
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_repository_index_incremental_updates(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "pkg").mkdir(parents=True)
+    (repo / "pkg" / "a.py").write_text(TEST_CODE, encoding="utf-8")
+    (repo / "pkg" / "b.py").write_text("def parse_tokens(text):\n    return text.split()\n", encoding="utf-8")
+    (repo / "c.py").write_text("def unused():\n    pass\n", encoding="utf-8")
+    encoded = []
+
+    def mock_encode(texts):
+        encoded.extend(texts)
+        return np.array([[float("tokens" in t), 1.0] for t in texts], dtype=np.float32)
+
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.side_effect = mock_encode
+        opt = SemanticOptimizer(top_k=1, index=str(tmp_path / "index"))
+
+        stats = opt.index_repository(str(repo))
+        assert stats == {"added": 3, "updated": 0, "removed": 0, "unchanged": 0}
+        assert opt.index_repository(str(repo))["unchanged"] == 3
+
+        encoded.clear()
+        (repo / "pkg" / "b.py").write_text(
+            "def parse_tokens(text):\n    return text.split(',')\n", encoding="utf-8"
+        )
+        (repo / "c.py").unlink()
+        (repo / "d.py").write_text("def added():\n    return 1\n", encoding="utf-8")
+        stats = opt.index_repository(str(repo))
+        assert stats == {"added": 1, "updated": 1, "removed": 1, "unchanged": 1}
+        assert len(encoded) == 2  # only the edited and new functions
+
+        result = opt.optimize(context="", query="tokens")
+        assert result.metrics.retrieval_mode == "semantic_repository"
+        hit = result.metrics.details["results"][0]
+        assert (hit["path"], hit["name"], hit["lineno"]) == (os.path.join("pkg", "b.py"), "parse_tokens", 1)
+        assert "# pkg/b.py:1-2\ndef parse_tokens(text):" in result.content.replace(os.sep, "/")
+
+    # The index persists across instances
+    from scaledown.optimizer import RepositoryIndex
+    reopened = RepositoryIndex(str(tmp_path / "index"))
+    assert len(reopened) == len(opt.index)
+    assert "c.py" not in reopened.files
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_repository_index_updates_in_place(tmp_path, monkeypatch):
+    from scaledown.optimizer import RepositoryIndex, semantic_index
+
+    # Small blocks and capacity, so growth and multi-block compaction are exercised
+    monkeypatch.setattr(semantic_index, "_INITIAL_CAPACITY", 4)
+    monkeypatch.setattr(semantic_index, "_COPY_BLOCK_ROWS", 3)
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for i in range(6):
+        (repo / f"m{i}.py").write_text(f"def f{i}():\n    return {i}\n\ndef g{i}():\n    return -{i}\n", encoding="utf-8")
+    (repo / "broken.py").symlink_to(repo / "missing.py")
+
+    def encode(texts):
+        return np.array([[float(sum(map(ord, t))), float(len(t))] for t in texts], dtype=np.float32)
+
+    def rows(index):
+        return sorted(
+            (index.chunks[int(i)]["path"], index.chunks[int(i)]["name"], tuple(v))
+            for i, v in zip(index.ids, np.asarray(index.vectors))
+        )
+
+    index = RepositoryIndex(str(tmp_path / "index"))
+    assert index.update(str(repo), encode, "m")["added"] == 6
+
+    # Nothing changed: nothing is rewritten
+    vectors_path = tmp_path / "index" / "vectors.npy"
+    before = vectors_path.stat().st_mtime_ns, (tmp_path / "index" / "index.json").stat().st_mtime_ns
+    assert index.update(str(repo), encode, "m")["unchanged"] == 6
+    assert (vectors_path.stat().st_mtime_ns, (tmp_path / "index" / "index.json").stat().st_mtime_ns) == before
+
+    # Removed rows are compacted away and new ones appended; the result matches a fresh build
+    (repo / "m1.py").unlink()
+    (repo / "m3.py").write_text("def f3():\n    return 33\n", encoding="utf-8")
+    (repo / "new.py").write_text("def h():\n    return 0\n", encoding="utf-8")
+    assert index.update(str(repo), encode, "m") == {"added": 1, "updated": 1, "removed": 1, "unchanged": 4}
+    fresh = RepositoryIndex(str(tmp_path / "fresh"))
+    fresh.update(str(repo), encode, "m")
+    assert rows(index) == rows(fresh)
+    assert rows(RepositoryIndex(str(tmp_path / "index"))) == rows(fresh)
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_repository_index_failed_update_is_retried(tmp_path):
+    from scaledown.optimizer import RepositoryIndex
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text(TEST_CODE, encoding="utf-8")
+    (repo / "b.py").write_text("def parse_tokens(text):\n    return text.split()\n", encoding="utf-8")
+    calls = []
+
+    def flaky_encode(texts):
+        calls.append(texts)
+        if len(calls) == 2:
+            raise RuntimeError("model unavailable")
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+    index = RepositoryIndex(str(tmp_path / "index"))
+    with pytest.raises(RuntimeError):
+        index.update(str(repo), flaky_encode, "m", batch_size=2)
+    assert index.files == {} and len(index) == 0
+
+    stats = index.update(str(repo), flaky_encode, "m", batch_size=2)
+    assert stats == {"added": 2, "updated": 0, "removed": 0, "unchanged": 0}
+    assert len(index) == len(index.chunks) == sum(len(r["ids"]) for r in index.files.values())
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw", "ivfpq"])
+def test_build_index_types(index_type):
+    from scaledown.optimizer.ann_index import build_index
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((3000, 32)).astype(np.float32)
+    index, built = build_index(vectors, index_type, nprobe=16)
+    assert built == index_type
+
+    _, ids = index.search(vectors[:20] + 0.001, 1)
+    assert (ids[:, 0] == np.arange(20)).mean() >= 0.9
+
+    # Too few vectors to train falls back to exact search
+    _, built = build_index(vectors[:10], index_type)
+    assert built == ("hnsw" if index_type == "hnsw" else "flat")
+
+    with pytest.raises(ValueError):
+        SemanticOptimizer(index_type="lsh")
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_model_registry_shares_and_unloads_models(temp_python_file):
+    import time
+    from scaledown.optimizer import ModelRegistry
+
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.side_effect = lambda texts: np.ones((len(texts), 2), dtype=np.float32)
+        first = SemanticOptimizer(top_k=1).warmup()
+        second = SemanticOptimizer(top_k=1)
+        second.optimize(context="", file_path=temp_python_file, query="load")
+
+        assert MockModel.call_count == 1
+        MockModel.return_value.encode.assert_any_call(["def warmup():\n    return None"])
+
+    loader = MagicMock()
+    registry = ModelRegistry(idle_timeout=0.05)
+    assert registry.get("m", loader) is registry.get("m", loader)
+    assert "m" in registry
+    deadline = time.monotonic() + 2
+    while "m" in registry and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "m" not in registry
+
+    registry.get("m", loader)
+    assert loader.call_count == 2
+    registry.set_idle_timeout(None)
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_reduced_precision_search_rescores(temp_python_file):
+    from scaledown.optimizer.ann_index import VectorSearch
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[:20] + 0.01
+
+    exact = VectorSearch(vectors)
+    compact = VectorSearch(vectors, vector_dtype="int8", truncate_dim=32, rescore_factor=50)
+    assert compact.details()["embedding_dim"] == 32
+    assert compact.memory_bytes * 6 < exact.memory_bytes
+    with patch("faiss.serialize_index", side_effect=AssertionError("serialized per query")):
+        assert compact.details()["index_memory_bytes"] == compact.memory_bytes
+
+    distances, positions = compact.search(queries, 3)
+    assert (positions[:, 0] == np.arange(20)).all()
+    # Re-scored distances are exact full-precision ones
+    np.testing.assert_allclose(distances[:, 0], exact.search(queries, 1)[0][:, 0], rtol=1e-4)
+
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.side_effect = lambda texts: np.ones((len(texts), 4), dtype=np.float32)
+        opt = SemanticOptimizer(top_k=1, vector_dtype="float16")
+        details = opt.optimize(context="", file_path=temp_python_file).metrics.details
+        assert details["vector_dtype"] == "float16"
+        assert details["index_memory_bytes"] > 0
+
+
+PID_MODEL_SOURCE = """
+import os
+import numpy as np
+
+class PidModel:
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def encode(self, texts, **kwargs):
+        return np.array([[float(len(t)), float(os.getpid())] for t in texts], dtype=np.float32)
+"""
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_offline_encoders(temp_python_file):
+    from scaledown.optimizer import HashingEncoder, TfidfProjectionEncoder
+
+    with patch("sentence_transformers.SentenceTransformer") as MockModel:
+        result = SemanticOptimizer(top_k=1, encoder="hashing").optimize(
+            context="", file_path=temp_python_file, query="processBatch"
+        )
+        MockModel.assert_not_called()
+    assert "def process_batch" in result.content
+    assert result.metrics.retrieval_mode == "semantic_search"
+
+    texts = ["def load_data(source): pass", "def loadData(source): pass", "def write_report(): pass"]
+    vectors = HashingEncoder(dim=64).encode(texts)
+    assert vectors.shape == (3, 64)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_array_equal(vectors, HashingEncoder(dim=64).encode(texts))
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+    encoder = TfidfProjectionEncoder(dim=64)
+    opt = SemanticOptimizer(encoder=encoder)
+    assert opt.model_name == "tfidf-64"
+    encoder.fit(texts)
+    assert opt.model_name.startswith("tfidf-64-")
+    np.testing.assert_array_equal(TfidfProjectionEncoder(dim=64, idf=encoder.idf).encode(texts), encoder.encode(texts))
+    with pytest.raises(ValueError):
+        SemanticOptimizer(encoder="word2vec")
+
+@pytest.mark.skipif(not SEMANTIC_DEPS_AVAILABLE, reason="Semantic deps not installed")
+def test_multi_process_encoder(temp_python_file, tmp_path, monkeypatch):
+    from scaledown.optimizer import MultiProcessEncoder
+
+    # A small importable module, so worker processes need not import this test file
+    (tmp_path / "pid_model.py").write_text(PID_MODEL_SOURCE, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    from pid_model import PidModel
+
+    texts = ["x" * i for i in range(1, 41)]
+    with MultiProcessEncoder("pid-model", processes=2, batch_size=4, loader=PidModel) as encoder:
+        vectors = encoder.encode(texts)
+        assert vectors[:, 0].tolist() == [float(len(t)) for t in texts]
+        assert os.getpid() not in set(vectors[:, 1].tolist())
+
+        opt = SemanticOptimizer(top_k=1, encoder=encoder)
+        assert opt.model_name == "pid-model"
+        # Truncated vectors get their own embedding space
+        assert MultiProcessEncoder("pid-model", max_seq_length=512).name == "pid-model-max512"
+        result = opt.optimize(context="", file_path=temp_python_file, query="q")
+        assert result.metrics.retrieval_mode == "semantic_search"